@@ -1,14 +1,21 @@
 from flask import Flask, jsonify, request
 from models import db
 from config import get_config
+from migrations import run_migrations, stamp_migrations
 from routes.jobs import jobs
 from routes.applications import applications
-from routes.webhooks import webhooks
+from routes.webhooks import webhooks, process_whatsapp_message
+from routes.metrics import metrics
+from routes.chat import chat
+from routes.ai import ai
+from services.work_queue import init_work_queue, start_work_queue_workers
+from services.dedup import init_message_dedup
 from flask_cors import CORS
 import os
 import sys
 from logger import logger
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.serving import is_running_from_reloader
 
 def create_app():
     """Initialize the core application"""
@@ -24,12 +31,19 @@ def create_app():
     db.init_app(app)
     
     # Enable CORS for all routes and origins
-    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, expose_headers=["X-Next-Cursor", "ETag"])
     
     # Register blueprints
     app.register_blueprint(jobs, url_prefix='/api/jobs')
     app.register_blueprint(applications, url_prefix='/api/applications')
     app.register_blueprint(webhooks, url_prefix='/api/webhook')
+    app.register_blueprint(metrics, url_prefix='/api/metrics')
+    app.register_blueprint(chat, url_prefix='/api/chat')
+    app.register_blueprint(ai, url_prefix='/api/ai')
+    
+    # WhatsApp messages are processed by background workers, started with the server
+    init_work_queue(app, process_whatsapp_message)
+    init_message_dedup(app)
     
     # Root path handler
     @app.route('/')
@@ -54,6 +68,7 @@ def recreate_database(app):
             db.drop_all()
             logger.info("Creating all tables with updated schema")
             db.create_all()
+            stamp_migrations(app)
             logger.info("Database recreated successfully with updated schema")
             return True
         except Exception as e:
@@ -70,6 +85,27 @@ if __name__ == '__main__':
         print("Database recreated successfully!" if success else "Failed to recreate database")
         sys.exit(0)
     
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrate':
+        success = run_migrations(app)
+        print("Database migrated successfully!" if success else "Failed to migrate database")
+        sys.exit(0 if success else 1)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--analyze-job':
+        # Usage: python app.py --analyze-job JOB_ID [--concurrency N]
+        from services.analysis import analyze_applications
+        from models import Application
+        concurrency = int(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[3] == '--concurrency' else None
+        with app.app_context():
+            application_ids = [application_id for application_id, in db.session.query(Application.id).filter(Application.job_id == int(sys.argv[2]))]
+            summary = analyze_applications(
+                application_ids,
+                concurrency=concurrency,
+                progress=lambda done, total: print(f"\rAnalyzed {done}/{total} applications", end="", flush=True)
+            )
+        print(f"\nAnalyzed {len(summary['analyzed'])}, not found {len(summary['not_found'])}, "
+              f"failed {len(summary['failed'])} in {summary['elapsed_seconds']}s")
+        sys.exit(0 if not summary['failed'] else 1)
+    
     # Parse port from arguments or environment
     port = 8001  # Default port
     args = sys.argv[1:]
@@ -82,5 +118,11 @@ if __name__ == '__main__':
     # Alternatively, get from environment
     port = int(os.environ.get('PORT', port))
     
+    # Serving starts the queue workers. With the reloader this script also runs in a
+    # watcher process that never serves requests, so they start in the serving child only.
+    debug = True
+    if not debug or is_running_from_reloader():
+        start_work_queue_workers(app)
+    
     print(f"Starting server on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=debug) 
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Benchmark and check of batch application analysis on the fake LLM backend.
+
+Seeds a throwaway SQLite database with a job and applications that each have a short
+WhatsApp conversation, then runs services.analysis.analyze_applications over all of
+them at each concurrency. Reports the wall time and checks that every application
+ended up with an AIAnalysis row, a match score and skill links; exits non-zero if any
+is missing, so it doubles as a test of the batch path.
+
+Usage:
+    python benchmarks/bench_batch_analysis.py [--applications 100] [--concurrency 1,4,16] [--latency-ms 100]
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_batch_analysis_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ['WORK_QUEUE_PATH'] = os.path.join(_db_dir, 'work_queue.db')
+os.environ['WEBHOOK_WORKERS'] = '0'
+os.environ['LLM_BACKEND'] = 'fake'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=100)
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrencies to run")
+    parser.add_argument('--latency-ms', type=float, default=100, help="fake model latency per analysis")
+    return parser.parse_args()
+
+
+def seed(applications):
+    from models import db, Job, Application, ConversationTurn
+    job = Job(jobTitle="Backend Engineer", department="Engineering", description="Build APIs",
+              requirements="Python, Flask, SQL and Docker")
+    db.session.add(job)
+    db.session.flush()
+    for i in range(applications):
+        number = f"91{i:010d}"
+        db.session.add(Application(job_id=job.id, applicant_name=f"Candidate {i}", whatsapp_number=number))
+        db.session.add_all([
+            ConversationTurn(phone_number=number, role='user', text="I have five years of Python and Flask, some Docker"),
+            ConversationTurn(phone_number=number, role='model', text="Thanks! Have you worked with SQL databases?"),
+            ConversationTurn(phone_number=number, role='user', text="Yes, PostgreSQL and SQLite in production"),
+        ])
+    db.session.commit()
+    return [application_id for application_id, in db.session.query(Application.id).order_by(Application.id)]
+
+
+def check(application_ids):
+    """Return the IDs of applications missing an analysis, a match score or skills"""
+    from models import db, Application, AIAnalysis
+    scored = {
+        application_id
+        for application_id, in db.session.query(AIAnalysis.application_id).filter(AIAnalysis.match_score.isnot(None))
+    }
+    links = Application.skills.property.secondary
+    with_skills = {application_id for application_id, in db.session.query(links.c.application_id).distinct()}
+    return [application_id for application_id in application_ids if application_id not in scored or application_id not in with_skills]
+
+
+def main():
+    args = parse_args()
+    os.environ['FAKE_LLM_LATENCY_MS'] = str(args.latency_ms)
+
+    from app import app
+    from models import db, AIAnalysis
+    from services.analysis import analyze_applications
+    import logging
+    logging.getLogger("hr_system").setLevel(logging.WARNING)
+
+    failed = False
+    print(f"{'concurrency':>11} | {'seconds':>8} | {'analyzed':>8} | {'failed':>6} | {'missing':>7}")
+    print("-" * 53)
+    with app.app_context():
+        db.create_all()
+        application_ids = seed(args.applications)
+        for concurrency in [int(c) for c in args.concurrency.split(',')]:
+            AIAnalysis.query.delete()
+            db.session.commit()
+            summary = analyze_applications(application_ids, concurrency=concurrency)
+            missing = check(application_ids)
+            failed = failed or bool(missing or summary['failed'])
+            print(f"{concurrency:>11} | {summary['elapsed_seconds']:>8.2f} | {len(summary['analyzed']):>8} | "
+                  f"{len(summary['failed']):>6} | {len(missing):>7}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
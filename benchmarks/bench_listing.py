@@ -0,0 +1,128 @@
+"""
+Benchmark for the paginated listing endpoints.
+
+Seeds a throwaway SQLite database with a growing number of applications and
+reports how many SQL statements and how much time one page of
+GET /api/applications/ and GET /api/jobs/ costs at each size.
+
+Usage:
+    python benchmarks/bench_listing.py [--sizes 1000,10000,50000] [--limit 100]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_listing_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ['WORK_QUEUE_PATH'] = os.path.join(_db_dir, 'work_queue.db')
+os.environ['WEBHOOK_WORKERS'] = '0'
+
+from sqlalchemy import event
+from app import app
+from models import db, Job, Question, Application, Answer
+
+ANSWERS_PER_APPLICATION = 5
+QUESTIONS_PER_JOB = 5
+JOBS = 50
+
+
+class QueryCounter:
+    """Count SQL statements executed against the engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def seed(target_size):
+    """Grow the applications table to target_size rows"""
+    if Job.query.count() == 0:
+        for j in range(JOBS):
+            job = Job(jobTitle=f"Job {j}", department="Engineering", description="d", requirements="r")
+            db.session.add(job)
+            db.session.flush()
+            for q in range(QUESTIONS_PER_JOB):
+                db.session.add(Question(job_id=job.id, text=f"Question {q}"))
+        db.session.commit()
+
+    current = Application.query.count()
+    statuses = ['new', 'screening', 'interview', 'hired', 'rejected']
+    for i in range(current, target_size):
+        application = Application(
+            job_id=(i % JOBS) + 1,
+            applicant_name=f"Applicant {i}",
+            whatsapp_number=f"91{i:010d}",
+            status=statuses[i % len(statuses)],
+        )
+        db.session.add(application)
+        if i % 1000 == 999:
+            db.session.flush()
+    db.session.flush()
+
+    # Answers are inserted in bulk to keep seeding time reasonable
+    missing = db.session.query(Application.id).filter(~Application.answers.any()).all()
+    db.session.bulk_insert_mappings(Answer, [
+        {'application_id': app_id, 'question_text': f"Question {q}", 'answer_text': "answer"}
+        for (app_id,) in missing for q in range(ANSWERS_PER_APPLICATION)
+    ])
+    db.session.commit()
+
+
+def measure(client, url, repeat=5):
+    """Return (queries per request, median latency in ms) for a GET request"""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with QueryCounter(db.engine) as counter:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.data
+        queries = counter.count
+    timings.sort()
+    return queries, timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    client = app.test_client()
+
+    print(f"{'rows':>8} | {'endpoint':<50} | {'queries':>7} | {'p50 ms':>8}")
+    print("-" * 83)
+    with app.app_context():
+        for size in sizes:
+            seed(size)
+            # Cursor deep into the table, to show the page cost does not depend on position
+            deep_cursor = max(size - 2 * args.limit, 0)
+            for url in (
+                f"/api/applications/?limit={args.limit}",
+                f"/api/applications/?limit={args.limit}&after={deep_cursor}",
+                f"/api/applications/?limit={args.limit}&job_id=1&status=new",
+                f"/api/jobs/?limit={args.limit}",
+            ):
+                queries, p50 = measure(client, url)
+                print(f"{size:>8} | {url:<50} | {queries:>7} | {p50:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
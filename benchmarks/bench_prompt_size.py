@@ -0,0 +1,105 @@
+"""
+Benchmark of the HR agent system prompt in full and compact catalog modes.
+
+Seeds catalogs of growing size and reports, for each mode, the system prompt size
+in tokens and the time to assemble it. Tokens are estimated at 4 characters per
+token unless --count-tokens is given, which asks the Gemini API for exact counts.
+With --live, each size also runs a few real talk_to_HR_agent turns and reports
+their end-to-end latency (needs a valid GEMINI_API_KEY).
+
+Usage:
+    python benchmarks/bench_prompt_size.py [--sizes 10,50,200,1000] [--count-tokens] [--live]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_prompt_size_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ['WORK_QUEUE_PATH'] = os.path.join(_db_dir, 'work_queue.db')
+os.environ['WEBHOOK_WORKERS'] = '0'
+
+import logging
+from app import app
+from models import db, Job, Question
+from services.catalog import bump_catalog_version
+from services.ai_service import build_system_prompt, talk_to_HR_agent, llm
+
+LIVE_QUESTIONS = [
+    "Hi, what jobs do you have in Engineering?",
+    "Tell me more about the requirements for job 3",
+]
+
+DESCRIPTION = (
+    "You will design, build and operate services used by thousands of candidates every day. "
+    "You will work closely with product and design, review code, mentor teammates and own "
+    "features from idea to production. "
+) * 3
+REQUIREMENTS = "3+ years of experience with Python, SQL, REST APIs, testing and cloud deployments. " * 2
+
+
+def seed(target_size):
+    """Grow the job catalog to target_size jobs, each with 5 questions"""
+    departments = ['Engineering', 'Sales', 'Marketing', 'Operations', 'Finance']
+    for j in range(Job.query.count(), target_size):
+        job = Job(
+            jobTitle=f"Role {j}",
+            department=departments[j % len(departments)],
+            description=DESCRIPTION,
+            requirements=REQUIREMENTS,
+            aiInstructions="Be friendly and ask about recent projects.",
+        )
+        db.session.add(job)
+        db.session.flush()
+        for q in range(5):
+            db.session.add(Question(job_id=job.id, text=f"Screening question {q} for role {j}?"))
+    db.session.commit()
+    bump_catalog_version()
+
+
+def count_tokens(prompt, exact):
+    if exact:
+        return llm.client.models.count_tokens(model="gemini-2.0-flash", contents=prompt).total_tokens
+    return len(prompt) // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,50,200,1000')
+    parser.add_argument('--count-tokens', action='store_true')
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+    logging.getLogger("hr_system").setLevel(logging.ERROR)
+
+    print(f"{'jobs':>6} | {'mode':<8} | {'prompt tokens':>13} | {'build ms':>8} | {'turn p50 ms':>11}")
+    print("-" * 60)
+    with app.app_context():
+        for size in [int(s) for s in args.sizes.split(',')]:
+            seed(size)
+            for mode in ('full', 'compact'):
+                app.config['HR_AGENT_CATALOG_MODE'] = mode
+                build_system_prompt()  # warm the catalog cache
+                start = time.perf_counter()
+                prompt = build_system_prompt()
+                build_ms = (time.perf_counter() - start) * 1000
+                tokens = count_tokens(prompt, args.count_tokens)
+
+                turn_ms = "-"
+                if args.live:
+                    timings = []
+                    for question in LIVE_QUESTIONS:
+                        start = time.perf_counter()
+                        talk_to_HR_agent(phone_number="bench", text=question)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    turn_ms = f"{sorted(timings)[len(timings) // 2]:.0f}"
+
+                print(f"{size:>6} | {mode:<8} | {tokens:>13} | {build_ms:>8.2f} | {turn_ms:>11}")
+
+
+if __name__ == '__main__':
+    main()
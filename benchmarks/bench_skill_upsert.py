@@ -0,0 +1,144 @@
+"""
+Benchmark for saving the skills extracted by AI application analysis.
+
+Seeds a throwaway SQLite database with applications and compares, for batches of
+applications with a realistic number of skills each (drawn from a vocabulary that
+repeats across candidates, in mixed case), the per-skill loop analyze_application
+used to run against services.skills.add_application_skills. Reports SQL statements
+and time per application, cold (empty skill table) and warm (skills already known).
+
+Usage:
+    python benchmarks/bench_skill_upsert.py [--applications 500] [--skills-per-application 12] [--vocabulary 300]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_skill_upsert_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ['WORK_QUEUE_PATH'] = os.path.join(_db_dir, 'work_queue.db')
+os.environ['WEBHOOK_WORKERS'] = '0'
+
+from sqlalchemy import event
+from app import app
+from models import db, Job, Application, Skill
+from services.skills import add_application_skills, clear_skill_cache
+
+BATCH_SIZE = 25
+
+
+class QueryCounter:
+    """Count SQL statements executed against the engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def legacy_save_skills(application, skill_names):
+    """The per-skill loop analyze_application ran before services.skills"""
+    for skill_name in skill_names:
+        skill = Skill.query.filter_by(name=skill_name).first()
+        if not skill:
+            skill = Skill(name=skill_name)
+            db.session.add(skill)
+            db.session.flush()
+        if skill not in application.skills:
+            application.skills.append(skill)
+
+
+def reset(applications):
+    """Empty the skill tables and seed fresh applications"""
+    links = Application.skills.property.secondary
+    db.session.execute(links.delete())
+    Skill.query.delete()
+    Application.query.delete()
+    if Job.query.count() == 0:
+        db.session.add(Job(jobTitle="Engineer", department="Engineering", description="d", requirements="r"))
+        db.session.flush()
+    job_id = Job.query.first().id
+    db.session.add_all([
+        Application(job_id=job_id, applicant_name=f"Candidate {i}", whatsapp_number=f"91{i:010d}")
+        for i in range(applications)
+    ])
+    db.session.commit()
+    clear_skill_cache()
+    return [application_id for application_id, in db.session.query(Application.id).order_by(Application.id)]
+
+
+def make_skills(application_ids, per_application, vocabulary_size, rng):
+    vocabulary = [f"skill {i}" for i in range(vocabulary_size)]
+    return {
+        application_id: [
+            rng.choice([name, name.title(), name.upper()])
+            for name in rng.sample(vocabulary, per_application)
+        ]
+        for application_id in application_ids
+    }
+
+
+def run_legacy(skills):
+    for start in range(0, len(skills), BATCH_SIZE):
+        batch = list(skills)[start:start + BATCH_SIZE]
+        for application in Application.query.filter(Application.id.in_(batch)):
+            # Case variants are distinct names to the legacy loop; lower-case them so it
+            # stores the same vocabulary as the interned path
+            legacy_save_skills(application, [name.lower() for name in skills[application.id]])
+        db.session.commit()
+
+
+def run_bulk(skills):
+    for start in range(0, len(skills), BATCH_SIZE):
+        batch = list(skills)[start:start + BATCH_SIZE]
+        add_application_skills({application_id: skills[application_id] for application_id in batch})
+        db.session.commit()
+
+
+def measure(name, run, skills):
+    with QueryCounter(db.engine) as counter:
+        start = time.perf_counter()
+        run(skills)
+        elapsed = time.perf_counter() - start
+    links = db.session.execute(Application.skills.property.secondary.select()).fetchall()
+    n = len(skills)
+    print(f"{name:<28} | {counter.count / n:>13.1f} | {elapsed * 1000 / n:>9.3f} | {Skill.query.count():>6} | {len(links):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--applications', type=int, default=500)
+    parser.add_argument('--skills-per-application', type=int, default=12)
+    parser.add_argument('--vocabulary', type=int, default=300)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"{'':<28} | {'queries / app':>13} | {'ms / app':>9} | {'skills':>6} | {'links':>6}")
+    print("-" * 74)
+    with app.app_context():
+        db.create_all()
+        for name, run in (("legacy per-skill loop", run_legacy), ("bulk upsert", run_bulk)):
+            application_ids = reset(args.applications)
+            skills = make_skills(application_ids, args.skills_per_application, args.vocabulary, rng)
+            measure(f"{name} (cold)", run, skills)
+            # A second analysis of the same candidates: every skill and link already exists
+            measure(f"{name} (warm)", run, skills)
+
+
+if __name__ == '__main__':
+    main()
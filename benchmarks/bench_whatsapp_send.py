@@ -0,0 +1,69 @@
+"""
+Benchmark for outbound WhatsApp sends against the local fake Graph API.
+
+Compares a fresh connection per message (the previous requests.post behaviour),
+the pooled client sending one message at a time, and the concurrent batch API.
+
+Usage:
+    python benchmarks/bench_whatsapp_send.py [--messages 200] [--latency-ms 80] [--error-rate 0.05]
+"""
+import os
+import sys
+import time
+import argparse
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_graph_server import start_fake_graph_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=20)
+    args = parser.parse_args()
+
+    server = start_fake_graph_server(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update({
+        'WHATSAPP_API_BASE_URL': base_url,
+        'WHATSAPP_API_TOKEN': 'benchmark',
+        'WHATSAPP_PHONE_NUMBER_ID': '123',
+        'WHATSAPP_POOL_SIZE': str(args.workers),
+    })
+
+    import logging
+    logging.getLogger("hr_system").setLevel(logging.ERROR)
+    from services.whatsapp import send_whatsapp_message, send_whatsapp_messages
+
+    messages = [(f"91{i:010d}", f"Benchmark message {i}") for i in range(args.messages)]
+    payload = {"messaging_product": "whatsapp", "to": "1", "type": "text", "text": {"body": "x"}}
+
+    results = []
+
+    start = time.perf_counter()
+    for _ in messages:
+        requests.post(f"{base_url}/v22.0/123/messages", json=payload, headers={"Connection": "close"})
+    results.append(("new connection per message", time.perf_counter() - start, len(messages)))
+
+    start = time.perf_counter()
+    ok = sum(send_whatsapp_message(*m) for m in messages)
+    results.append(("pooled client, sequential", time.perf_counter() - start, ok))
+
+    start = time.perf_counter()
+    ok = sum(send_whatsapp_messages(messages, max_workers=args.workers))
+    results.append((f"pooled client, batch x{args.workers}", time.perf_counter() - start, ok))
+
+    print(f"{args.messages} messages, {args.latency_ms:.0f} ms server latency, {args.error_rate:.0%} injected errors")
+    print(f"{'mode':<30} | {'total s':>8} | {'msg/s':>8} | {'delivered':>9}")
+    print("-" * 64)
+    for name, elapsed, delivered in results:
+        print(f"{name:<30} | {elapsed:>8.2f} | {len(messages) / elapsed:>8.1f} | {delivered:>9}")
+    print(f"\nfake server saw {server.stats['requests']} requests, injected {server.stats['errors']} errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Query plan check for the schema migrations.
+
+Builds a SQLite database with the pre-migration schema (no secondary indexes),
+prints the plan of each hot query, runs the migrations, and checks that every
+hot query then searches an index instead of scanning its table.
+
+Usage:
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="check_query_plans_")
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'plans.db')}"
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ['WORK_QUEUE_PATH'] = os.path.join(_db_dir, 'work_queue.db')
+os.environ['WEBHOOK_WORKERS'] = '0'
+
+from sqlalchemy import text
+from app import app
+from models import db
+from migrations import MIGRATIONS, run_migrations
+
+# (name, SQL, index expected in the plan after migrating)
+HOT_QUERIES = [
+    ("applications by job",
+     "SELECT id FROM application WHERE job_id = 1 AND id > 0 ORDER BY id LIMIT 101",
+     "ix_application_job_id_id"),
+    ("applications by status",
+     "SELECT id FROM application WHERE status = 'new' AND id > 0 ORDER BY id LIMIT 101",
+     "ix_application_status_id"),
+    ("applications by phone",
+     "SELECT id FROM application WHERE whatsapp_number = '919999999999'",
+     "ix_application_whatsapp_number"),
+    ("questions for jobs",
+     "SELECT job_id, id, text, required FROM question WHERE job_id IN (1, 2, 3) ORDER BY job_id, id",
+     "ix_question_job_id_id"),
+    ("answers for applications",
+     "SELECT application_id, question_text, answer_text, required FROM answer "
+     "WHERE application_id IN (1, 2, 3) ORDER BY application_id, id",
+     "ix_answer_application_id_id"),
+]
+
+
+def query_plan(connection, sql):
+    return " | ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def print_plans(title):
+    print(f"\n{title}")
+    plans = {}
+    with db.engine.connect() as connection:
+        for name, sql, _ in HOT_QUERIES:
+            plans[name] = query_plan(connection, sql)
+            print(f"  {name:<26} {plans[name]}")
+    return plans
+
+
+def main():
+    with app.app_context():
+        # Emulate a database created before the migrations existed
+        with db.engine.begin() as connection:
+            for _, _, statements in MIGRATIONS:
+                for statement in statements:
+                    if not statement.startswith("CREATE INDEX"):
+                        continue
+                    index_name = statement.split("IF NOT EXISTS ")[1].split(" ")[0]
+                    connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            connection.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+
+        before = print_plans("Before migrating:")
+        assert run_migrations(app), "migrations failed"
+        after = print_plans("After migrating:")
+
+    failures = [name for name, _, index in HOT_QUERIES if index not in after[name]]
+    improved = [name for name, _, _ in HOT_QUERIES if before[name] != after[name]]
+    print(f"\n{len(improved)}/{len(HOT_QUERIES)} query plans changed by the migrations")
+    if failures:
+        print(f"FAILED: no index used for {', '.join(failures)}")
+        sys.exit(1)
+    print("OK: every hot query uses its index")
+
+
+if __name__ == '__main__':
+    main()
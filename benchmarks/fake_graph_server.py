@@ -0,0 +1,105 @@
+"""
+Local stand-in for the WhatsApp Graph API, for benchmarks and load tests.
+
+Accepts POST /<version>/<phone_number_id>/messages and
+GET /<version>/<phone_number_id>/media/<media_id> with keep-alive connections,
+after a configurable delay, and fails a configurable share of requests with 429/503.
+
+Usage:
+    python benchmarks/fake_graph_server.py [--port 8089] [--latency-ms 80] [--error-rate 0.0]
+
+Then point the app at it with WHATSAPP_API_BASE_URL=http://127.0.0.1:8089.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    # Write each response in one segment, so keep-alive clients don't hit delayed ACKs
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, body_factory):
+        server = self.server
+        with server.stats_lock:
+            server.stats['requests'] += 1
+        time.sleep(server.latency)
+        if random.random() < server.error_rate:
+            with server.stats_lock:
+                server.stats['errors'] += 1
+            self._reply(random.choice([429, 503]), {"error": {"message": "Injected failure"}})
+            return
+        self._reply(200, body_factory())
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.endswith('/messages'):
+            self._reply(404, {"error": {"message": "Unknown path"}})
+            return
+
+        def accept():
+            with self.server.stats_lock:
+                self.server.deliveries[payload.get('to')] = time.perf_counter()
+            return {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": payload.get('to'), "wa_id": payload.get('to')}],
+                "messages": [{"id": f"wamid.fake.{random.getrandbits(64):x}"}]
+            }
+        self._handle(accept)
+
+    def do_GET(self):
+        if '/media/' not in self.path:
+            self._reply(404, {"error": {"message": "Unknown path"}})
+            return
+        media_id = self.path.rsplit('/', 1)[-1]
+        self._handle(lambda: {"url": f"http://{self.headers.get('Host')}/files/{media_id}", "id": media_id})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_graph_server(port: int = 0, latency_ms: float = 80, error_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the fake server on a background thread; the bound port is server.server_address[1]"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGraphHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.error_rate = error_rate
+    server.stats = {'requests': 0, 'errors': 0}
+    server.deliveries = {}  # recipient -> perf_counter() of the last delivered message
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_fake_graph_server(args.port, args.latency_ms, args.error_rate)
+    print(f"Fake Graph API listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+End-to-end load harness for the WhatsApp webhook pipeline, fully offline.
+
+Runs the app on a local port with the fake LLM backend and the fake Graph API,
+drives POST /api/webhook/whatsapp at a target request rate (open loop, so a slow
+server does not slow the load down), waits for the replies to arrive at the fake
+Graph API, and reports throughput and latency percentiles for both the webhook
+response and the full message -> reply path.
+
+Usage:
+    python benchmarks/load_webhook.py [--rps 20] [--duration 30] [--workers 8]
+        [--llm-latency-ms 800] [--llm-error-rate 0.0] [--tool-call-rate 0.5]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from benchmarks.fake_graph_server import start_fake_graph_server
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def webhook_body(phone_number, message_id, text):
+    return {"entry": [{"changes": [{"value": {"messages": [{
+        "from": phone_number,
+        "id": message_id,
+        "type": "text",
+        "text": {"body": text},
+    }]}}]}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rps', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=8, help="webhook queue workers (WEBHOOK_WORKERS)")
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--tool-call-rate', type=float, default=0.5)
+    parser.add_argument('--graph-latency-ms', type=float, default=80)
+    parser.add_argument('--drain-timeout', type=float, default=120, help="seconds to wait for replies after the load stops")
+    parser.add_argument('--verbose', action='store_true', help="show the app's warning and error logs")
+    args = parser.parse_args()
+
+    graph = start_fake_graph_server(latency_ms=args.graph_latency_ms)
+    db_dir = tempfile.mkdtemp(prefix="load_webhook_")
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(db_dir, 'load.db')}",
+        'WORK_QUEUE_PATH': os.path.join(db_dir, 'work_queue.db'),
+        'WEBHOOK_WORKERS': str(args.workers),
+        'WHATSAPP_DEBOUNCE_SECONDS': '0',
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY_MS': str(args.llm_latency_ms),
+        'FAKE_LLM_ERROR_RATE': str(args.llm_error_rate),
+        'FAKE_LLM_TOOL_CALL_RATE': str(args.tool_call_rate),
+        'WHATSAPP_API_BASE_URL': f"http://127.0.0.1:{graph.server_address[1]}",
+        'WHATSAPP_API_TOKEN': 'load-test',
+        'WHATSAPP_PHONE_NUMBER_ID': '123',
+    })
+
+    import logging
+    logging.getLogger("hr_system").setLevel(logging.WARNING if args.verbose else logging.CRITICAL)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    from werkzeug.serving import make_server
+    from app import app
+    from services.work_queue import start_work_queue_workers
+    from migrations import run_migrations
+    from models import db, Job, Question
+    from services.catalog import bump_catalog_version
+    from services.ai_service import llm
+
+    run_migrations(app)
+    with app.app_context():
+        for j in range(20):
+            job = Job(jobTitle=f"Role {j}", department="Engineering", description="Build things", requirements="Python")
+            db.session.add(job)
+            db.session.flush()
+            db.session.add(Question(job_id=job.id, text="Why this role?"))
+        db.session.commit()
+        bump_catalog_version()
+
+    start_work_queue_workers(app)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/webhook/whatsapp"
+
+    total = int(args.rps * args.duration)
+    sent_at = {}
+    webhook_latencies = []
+    webhook_errors = []
+    lock = threading.Lock()
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=64))
+
+    def send(i):
+        phone_number = f"91{i:010d}"  # one sender per message, so no message is coalesced
+        start = time.perf_counter()
+        try:
+            response = session.post(url, json=webhook_body(phone_number, f"wamid.load.{i}", f"Hi, tell me about job {i % 20 + 1}"), timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            sent_at[phone_number] = start
+            webhook_latencies.append(elapsed * 1000)
+            if not ok:
+                webhook_errors.append(i)
+
+    print(f"Driving {total} messages at {args.rps:g} rps for {args.duration:g}s "
+          f"({args.workers} workers, fake LLM {args.llm_latency_ms:g} ms, {args.llm_error_rate:.0%} errors)")
+    load_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        for i in range(total):
+            delay = load_start + i / args.rps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, i)
+    load_elapsed = time.perf_counter() - load_start
+
+    deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < deadline and len(graph.deliveries) < total:
+        time.sleep(0.2)
+    drain_elapsed = time.perf_counter() - load_start
+
+    e2e = [(graph.deliveries[p] - t) * 1000 for p, t in sent_at.items() if p in graph.deliveries]
+    last_delivery = max(graph.deliveries.values(), default=load_start)
+
+    print(f"\n{'':<22} | {'count':>6} | {'per s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 84)
+    for name, values, elapsed in (
+        ("webhook response", webhook_latencies, load_elapsed),
+        ("message -> reply", e2e, last_delivery - load_start),
+    ):
+        rate = len(values) / elapsed if elapsed > 0 else 0
+        print(f"{name:<22} | {len(values):>6} | {rate:>7.1f} | {percentile(values, 50):>8.1f} | "
+              f"{percentile(values, 95):>8.1f} | {percentile(values, 99):>8.1f} | {max(values, default=float('nan')):>8.1f}")
+
+    print(f"\nwebhook errors: {len(webhook_errors)}, replies delivered: {len(graph.deliveries)}/{total} "
+          f"after {drain_elapsed:.1f}s, LLM calls: {llm.calls}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,40 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 500))
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 1000))
+    CATALOG_VERSION_TTL_SECONDS = float(os.getenv('CATALOG_VERSION_TTL_SECONDS', 1))
+    HR_AGENT_CATALOG_MODE = os.getenv('HR_AGENT_CATALOG_MODE', 'full')  # full or compact
+    HR_AGENT_HISTORY_TOKEN_BUDGET = int(os.getenv('HR_AGENT_HISTORY_TOKEN_BUDGET', 2000))
+    HR_AGENT_HISTORY_MAX_TURNS = int(os.getenv('HR_AGENT_HISTORY_MAX_TURNS', 40))
+    HR_AGENT_COMPACT_AFTER_TURNS = int(os.getenv('HR_AGENT_COMPACT_AFTER_TURNS', 10))
+    HR_AGENT_SUMMARY_MAX_CHARS = int(os.getenv('HR_AGENT_SUMMARY_MAX_CHARS', 2000))
+    HR_AGENT_TURN_BUDGET_SECONDS = float(os.getenv('HR_AGENT_TURN_BUDGET_SECONDS', 30))
+    HR_AGENT_MODEL = os.getenv('HR_AGENT_MODEL', 'gemini-2.0-flash')
+    HR_AGENT_ROUTING = os.getenv('HR_AGENT_ROUTING', 'true').lower() == 'true'
+    HR_AGENT_LIGHT_MODEL = os.getenv('HR_AGENT_LIGHT_MODEL', 'gemini-2.0-flash-lite')
+    HR_AGENT_LIGHT_MAX_CHARS = int(os.getenv('HR_AGENT_LIGHT_MAX_CHARS', 120))
+    HR_AGENT_LIGHT_TIMEOUT_SECONDS = float(os.getenv('HR_AGENT_LIGHT_TIMEOUT_SECONDS', 5))
+    LLM_BREAKER_WINDOW = int(os.getenv('LLM_BREAKER_WINDOW', 20))
+    LLM_BREAKER_MIN_CALLS = int(os.getenv('LLM_BREAKER_MIN_CALLS', 5))
+    LLM_BREAKER_FAILURE_RATE = float(os.getenv('LLM_BREAKER_FAILURE_RATE', 0.5))
+    LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv('LLM_BREAKER_SLOW_CALL_SECONDS', 15))
+    LLM_BREAKER_SLOW_CALL_RATE = float(os.getenv('LLM_BREAKER_SLOW_CALL_RATE', 0.8))
+    LLM_BREAKER_OPEN_SECONDS = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', 30))
+    LLM_BREAKER_MIN_BUDGET_SECONDS = float(os.getenv('LLM_BREAKER_MIN_BUDGET_SECONDS', 1))
+    ANALYSIS_CONCURRENCY = int(os.getenv('ANALYSIS_CONCURRENCY', 8))
+    ANALYSIS_MAX_CONCURRENCY = int(os.getenv('ANALYSIS_MAX_CONCURRENCY', 16))  # the breaker runs at most 16 calls at once
+    ANALYSIS_COMMIT_BATCH_SIZE = int(os.getenv('ANALYSIS_COMMIT_BATCH_SIZE', 25))
+    WORK_QUEUE_PATH = os.getenv('WORK_QUEUE_PATH', 'work_queue.db')
+    WORK_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv('WORK_QUEUE_VISIBILITY_TIMEOUT', 120))
+    WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', 5))
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 4))
+    WHATSAPP_DEBOUNCE_SECONDS = float(os.getenv('WHATSAPP_DEBOUNCE_SECONDS', 2))
+    WHATSAPP_DEBOUNCE_MAX_SECONDS = float(os.getenv('WHATSAPP_DEBOUNCE_MAX_SECONDS', 10))
+    WHATSAPP_DEDUP_TTL_SECONDS = int(os.getenv('WHATSAPP_DEDUP_TTL_SECONDS', 86400))
+    WHATSAPP_DEDUP_MAX_SIZE = int(os.getenv('WHATSAPP_DEDUP_MAX_SIZE', 100000))
+    WHATSAPP_DEDUP_PERSISTENT = os.getenv('WHATSAPP_DEDUP_PERSISTENT', 'false').lower() == 'true'
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -1,5 +1,7 @@
 """Market rates agent that can query MySQL data based on user queries"""
 
+import os
+import time
 from google.genai import types
 from agents.common.authenticate import get_identity_from_chat_id
 from agents.common.context import (
@@ -24,7 +26,6 @@ from agents.common.gemini_context import (
     get_user_query_object_list,
     get_response_object_list,
     save_chat_messages_to_history,
-    get_chat_messages_from_history,
     UserRequest,
     convert_history_to_contents,
     google_client,
@@ -32,12 +33,125 @@ from agents.common.gemini_context import (
 from agents.common.dynamic_prompts import (
     get_dynamic_prompt,
 )
+from agents.microagents.concierge.resilience import (
+    deadline_scope,
+    remaining_budget,
+    gemini_breaker,
+    gemini_light_breaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+)
+from agents.microagents.concierge.fanout import generate_with_parallel_tools
+from agents.microagents.concierge.ttl_cache import TTLCache
+from agents.microagents.concierge.history_store import (
+    get_history_contents,
+    save_history_messages,
+)
+from agents.microagents.concierge.tracing import span, traced, current_span
+from agents.microagents.concierge.routing import (
+    classify_turn,
+    record_route,
+    record_light_failure,
+    LIGHT,
+    FULL,
+    ESCALATED,
+    LIGHT_MODEL,
+    LIGHT_TIMEOUT_SECONDS,
+    LIGHT_INSTRUCTIONS,
+    ESCALATE_MARKER,
+)
 
 AGENT_NAME = "concierge"
 
+# "parallel" runs the sub-agents a model turn asks for concurrently, "automatic" leaves
+# function calling to google-genai, which runs them one after another
+TOOL_EXECUTION_MODE = os.getenv("CONCIERGE_TOOL_EXECUTION", "parallel")
+
+## dynamic prompts and identities rarely change; serve them from memory and refresh in the background
+dynamic_prompt_cache = TTLCache(
+    "dynamic_prompts",
+    ttl=float(os.getenv("CONCIERGE_PROMPT_CACHE_TTL", 300)),
+    stale_ttl=float(os.getenv("CONCIERGE_PROMPT_CACHE_STALE_TTL", 3600)),
+)
+identity_cache = TTLCache(
+    "identities",
+    ttl=float(os.getenv("CONCIERGE_IDENTITY_CACHE_TTL", 600)),
+    stale_ttl=float(os.getenv("CONCIERGE_IDENTITY_CACHE_STALE_TTL", 3600)),
+)
+
+
+def get_cached_dynamic_prompt(prompt_name: str) -> str:
+    return dynamic_prompt_cache.get(prompt_name, lambda: get_dynamic_prompt(prompt_name))
+
+
+def get_cached_identity(chat_id: str):
+    return identity_cache.get(chat_id, lambda: get_identity_from_chat_id(chat_id))
+
+
+def get_cache_metrics() -> dict:
+    """Hit rate and critical-path latency of the concierge's lookup caches"""
+    return {
+        "dynamic_prompts": dynamic_prompt_cache.get_metrics(),
+        "identities": identity_cache.get_metrics(),
+    }
+
+MODEL_NAME = "gemini-2.0-flash"
+
+FALLBACK_RESPONSE = "Sorry, I am having trouble answering right now. Please try again in a few minutes."
+
+
+def generate(contents, config, model: str = MODEL_NAME):
+    """One generate_content call, traced with its token usage"""
+    with span("generate_content", model=model, messages=len(contents)) as model_span:
+        response = google_client.models.generate_content(
+            model=model,
+            config=config,
+            contents=contents,
+        )
+        usage = response.usage_metadata
+        if model_span is not None and usage is not None:
+            model_span.set(
+                prompt_tokens=usage.prompt_token_count,
+                output_tokens=usage.candidates_token_count,
+                total_tokens=usage.total_token_count,
+                function_calls=len(response.function_calls or []),
+            )
+        return response
 
-def get_model_response(model_context: list) -> str:
-    """Generate the content for the user query"""
+
+def get_light_response(system_instructions: str, model_context: list):
+    """Answer a small-talk turn with the light model, without tools
+
+    Returns:
+        The model's response, or None if the full model should take the turn (the light
+        model failed, ran out of its short budget, gave no answer or asked to escalate)
+    """
+    try:
+        ## a short budget of its own, so a slow light model leaves time for the full one
+        with deadline_scope(LIGHT_TIMEOUT_SECONDS):
+            config = types.GenerateContentConfig(
+                system_instruction=system_instructions + LIGHT_INSTRUCTIONS,
+                max_output_tokens=256,
+                http_options=types.HttpOptions(timeout=max(int(remaining_budget() * 1000), 1)),
+            )
+            response = gemini_light_breaker.call(lambda: generate(model_context, config, model=LIGHT_MODEL))
+    except Exception as e:
+        logger.warning(f"light model failed, escalating to the full model: {e}")
+        record_light_failure()
+        return None
+    if not response.text or ESCALATE_MARKER in response.text:
+        logger.info("light model handed the turn to the full model")
+        return None
+    return response
+
+
+def get_model_response(model_context: list, route: str = FULL) -> str:
+    """Generate the content for the user query
+
+    Args:
+        model_context: The history and the user's message
+        route: "light" tries the light model first, "full" goes straight to the full model with the tools
+    """
     logger.info("entering get_model_response")
     logger.debug(f"model_context: {model_context}")
 
@@ -45,23 +159,33 @@ def get_model_response(model_context: list) -> str:
     modded_system_instructions = system_instruction.format(
         ABOUT_FARMART_PROMPT=ABOUT_FARMART_PROMPT,
     )
-    identity = get_identity_from_chat_id(get_chat_id())
+    identity = get_cached_identity(get_chat_id())
 
     if identity:
         modded_system_instructions += f"\n\nYou are talking to {identity}. Do not reveal any information about other users to this user."
 
     if get_interface() == "whatsapp":
-        modded_system_instructions += get_dynamic_prompt("wa_formatting_prompt")
+        modded_system_instructions += get_cached_dynamic_prompt("wa_formatting_prompt")
 
     ## add dynamic prompts
     modded_system_instructions += f"\n\nCurrent date and time is {datetime.now()}"
-    modded_system_instructions += get_dynamic_prompt("concierge_prompt")
-    modded_system_instructions += get_dynamic_prompt("concierge_tool_usage_prompt")
+    modded_system_instructions += get_cached_dynamic_prompt("concierge_prompt")
+
+    start = time.perf_counter()
+    response = None
+    if route == LIGHT:
+        response = get_light_response(modded_system_instructions, model_context)
+        if response is None:
+            route = ESCALATED
 
-    ## get the response from the llm
-    response = google_client.models.generate_content(
-        model="gemini-2.0-flash",
-        config=types.GenerateContentConfig(
+    if response is None:
+        modded_system_instructions += get_cached_dynamic_prompt("concierge_tool_usage_prompt")
+
+        ## get the response from the llm, within the turn's time budget
+        ## (the http timeout bounds each request, the breaker bounds the whole function calling loop)
+        remaining = remaining_budget()
+        http_options = types.HttpOptions(timeout=max(int(remaining * 1000), 1)) if remaining is not None else None
+        config = types.GenerateContentConfig(
             tools=[
                 talk_to_market_rates_agent,
                 talk_to_vehicle_tracking_agent,
@@ -74,15 +198,35 @@ def get_model_response(model_context: list) -> str:
                 disable=False
             ),
             system_instruction=modded_system_instructions,
-        ),
-        contents=model_context,
-    )
+            http_options=http_options,
+        )
+
+        try:
+            if TOOL_EXECUTION_MODE == "parallel":
+                response = gemini_breaker.call(
+                    lambda: generate_with_parallel_tools(generate, config, model_context)
+                )
+            else:
+                response = gemini_breaker.call(lambda: generate(model_context, config))
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            logger.warning(f"returning fallback response: {e}, breaker: {gemini_breaker.get_metrics()}")
+            turn = current_span()
+            if turn is not None:
+                turn.set(fallback=type(e).__name__)
+            logger.info("exiting get_model_response")
+            return [{"role": "model", "parts": [{"text": FALLBACK_RESPONSE}]}]
+
+    record_route(route, (time.perf_counter() - start) * 1000)
+    turn = current_span()
+    if turn is not None:
+        turn.set(route=route)
     logger.debug(f"response: {response}")
     parts = [part.to_json_dict() for part in response.candidates[0].content.parts]
     logger.info("exiting get_model_response")
     return [{"role": "model", "parts": parts}]
 
 
+@traced("concierge_turn", agent=AGENT_NAME)
 def get_response_from_concierge_agent(
     request: UserRequest,
 ) -> str:
@@ -100,23 +244,32 @@ def get_response_from_concierge_agent(
     """
     logger.info("entering get_response_from_concierge_agent")
     logger.debug(f"user_request: {request}")
+    turn = current_span()
+    if turn is not None:
+        turn.set(chat_id=get_chat_id(), interface=get_interface())
 
     user_query_object = get_user_query_object_list(request, AGENT_NAME)
 
-    # get the relevant history
-    relevant_history = get_chat_messages_from_history(agent_name=AGENT_NAME)
+    # get the newest history within the token budget; only messages added since the last turn are converted
+    relevant_history = get_history_contents(AGENT_NAME)
+
+    model_context = relevant_history + convert_history_to_contents(user_query_object)
 
-    model_context = relevant_history + user_query_object
-    model_context = convert_history_to_contents(model_context)
+    # small talk can be answered by the light model, everything else needs the team members
+    route, reason = classify_turn(request.text, has_media=bool(request.file_uri))
+    logger.info(f"routing turn to the {route} model ({reason})")
 
     # get the response from the chat
-    response_content = get_model_response(model_context)
+    with deadline_scope():
+        response_content = get_model_response(model_context, route=route)
     response_object = get_response_object_list(response_content, AGENT_NAME)
 
-    # save the query and response to the database
-    save_chat_messages_to_history(
-        agent_name=AGENT_NAME,
-        messages=user_query_object + response_object,
+    # save the query and response write-behind; the legacy history is written after the batch
+    messages = user_query_object + response_object
+    save_history_messages(
+        AGENT_NAME,
+        messages,
+        after_flush=lambda: save_chat_messages_to_history(agent_name=AGENT_NAME, messages=messages),
     )
     logger.debug(f"response_object: {response_object}")
     return response_object[-1]["content"]["parts"][0]["text"]
@@ -0,0 +1,131 @@
+"""
+Parallel execution of the concierge's sub-agent tool calls.
+
+With automatic function calling, google-genai runs the function calls of a model turn
+one after another, so a turn that consults three sub-agents waits for the sum of their
+latencies. generate_with_parallel_tools drives the function calling loop itself: it
+collects every function call of a model turn, runs the talk_to_* tools concurrently on
+a bounded pool, and sends all their responses back in a single step.
+"""
+
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+from google.genai import types
+from agents.config import logger
+from agents.microagents.concierge.tracing import span
+
+MAX_TOOL_ROUNDS = int(os.getenv("CONCIERGE_MAX_TOOL_ROUNDS", 5))
+TOOL_WORKERS = int(os.getenv("CONCIERGE_TOOL_WORKERS", 8))
+
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="concierge-tool")
+_stats_lock = threading.Lock()
+_stats = {"turns": 0, "tool_calls": 0, "parallel_rounds": 0, "latency_saved_ms": 0.0}
+
+
+def _run_tool(tools_by_name: dict, call: types.FunctionCall) -> Tuple[types.Part, float]:
+    """Run one function call and wrap its result (or error) as a function response part"""
+    start = time.perf_counter()
+    tool = tools_by_name.get(call.name)
+    try:
+        if tool is None:
+            response = {"error": f"Unknown tool {call.name}"}
+        else:
+            response = {"result": tool(**(call.args or {}))}
+    except Exception as e:
+        logger.error(f"tool {call.name} failed", exc_info=True)
+        response = {"error": str(e)}
+    return types.Part.from_function_response(name=call.name, response=response), time.perf_counter() - start
+
+
+def run_tool_calls(tools_by_name: dict, function_calls: List[types.FunctionCall]) -> Tuple[List[types.Part], float]:
+    """
+    Run the function calls of one model turn concurrently.
+
+    Each call runs with a copy of the caller's context variables (chat id, interface,
+    turn deadline), and the responses are returned in the order of the calls.
+
+    Returns:
+        tuple: (function response parts, seconds saved compared to running them one by one)
+    """
+    start = time.perf_counter()
+    if len(function_calls) == 1:
+        results = [_run_tool(tools_by_name, function_calls[0])]
+    else:
+        futures = [
+            _tool_executor.submit(contextvars.copy_context().run, _run_tool, tools_by_name, call)
+            for call in function_calls
+        ]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+    serial = sum(elapsed for _, elapsed in results)
+    return [part for part, _ in results], max(serial - wall, 0.0)
+
+
+def generate_with_parallel_tools(
+    generate: Callable[[list, types.GenerateContentConfig], types.GenerateContentResponse],
+    config: types.GenerateContentConfig,
+    contents: list,
+) -> types.GenerateContentResponse:
+    """
+    Run the function calling loop with each model turn's tool calls dispatched in parallel.
+
+    Args:
+        generate: Calls the model with (contents, config), e.g. through the circuit breaker
+        config: Model config with the tools; automatic function calling is turned off here
+        contents: The conversation so far
+
+    Returns:
+        The model's final response, with no function calls left
+    """
+    tools_by_name = {tool.__name__: tool for tool in config.tools if callable(tool)}
+    manual_config = config.model_copy(update={
+        "automatic_function_calling": types.AutomaticFunctionCallingConfig(disable=True),
+    })
+    contents = list(contents)
+    tool_calls = 0
+    saved = 0.0
+    parallel_rounds = 0
+
+    response = generate(contents, manual_config)
+    for _ in range(MAX_TOOL_ROUNDS):
+        function_calls = response.function_calls
+        if not function_calls:
+            break
+        logger.info(f"dispatching {len(function_calls)} tool calls: {[call.name for call in function_calls]}")
+        with span("tool_round", calls=len(function_calls)):
+            parts, round_saved = run_tool_calls(tools_by_name, function_calls)
+        tool_calls += len(function_calls)
+        saved += round_saved
+        parallel_rounds += len(function_calls) > 1
+
+        contents.append(response.candidates[0].content)
+        contents.append(types.Content(role="user", parts=parts))
+        response = generate(contents, manual_config)
+    else:
+        if response.function_calls:
+            # Out of rounds: ask for an answer from what the team members said so far
+            logger.warning(f"tool call limit of {MAX_TOOL_ROUNDS} rounds reached, forcing a text answer")
+            response = generate(contents, manual_config.model_copy(update={
+                "tool_config": types.ToolConfig(function_calling_config=types.FunctionCallingConfig(mode="NONE")),
+            }))
+
+    with _stats_lock:
+        _stats["turns"] += 1
+        _stats["tool_calls"] += tool_calls
+        _stats["parallel_rounds"] += parallel_rounds
+        _stats["latency_saved_ms"] += saved * 1000
+    if tool_calls:
+        logger.info(f"turn made {tool_calls} tool calls, parallel dispatch saved {saved * 1000:.0f}ms")
+    return response
+
+
+def get_fanout_metrics() -> dict:
+    """Totals of tool calls and latency saved by parallel dispatch, with the per-turn average"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["latency_saved_ms_per_turn"] = stats["latency_saved_ms"] / stats["turns"] if stats["turns"] else 0.0
+    return stats
@@ -0,0 +1,451 @@
+"""
+Incremental, token-bounded chat history for the concierge and its sub-agents.
+
+get_chat_messages_from_history returns a chat's whole history, and every turn converts
+all of it to Content again, so a turn costs more the longer the chat. This store keeps
+each message in a chat_history table indexed on (chat_id, agent, seq):
+
+- get_recent reads only the newest messages (at most max_messages, within a token budget)
+- HistoryStore.get_contents keeps the converted Content objects per chat and agent, so
+  each turn only fetches and converts the messages with a seq above the last one it saw
+
+Chats that predate the table are backfilled from get_chat_messages_from_history the
+first time they are read.
+
+Writes are write-behind: append_later assigns the messages their seq (after the stored
+and still buffered ones) and returns at once, and a background writer inserts everything buffered from all chats in one bulk
+insert when CHAT_HISTORY_FLUSH_MAX_BATCH messages are waiting or every
+CHAT_HISTORY_FLUSH_INTERVAL_MS, and on shutdown. Buffered messages are visible to
+reads straight away, so the next turn of a chat sees its previous one. If the bulk
+insert fails, the batch is written per chat and then per row; rows whose seq another
+process took are moved after the stored ones, and rows that still fail are retried on
+later flushes and dropped (logged) after CHAT_HISTORY_FLUSH_MAX_ATTEMPTS.
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import contextvars
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import (
+    create_engine, MetaData, Table, Column, Index, Integer, String, Text, DateTime, select, func, and_,
+)
+from sqlalchemy.exc import IntegrityError
+from agents.config import logger
+from agents.common.context import get_chat_id
+from agents.microagents.concierge.tracing import span
+from agents.common.gemini_context import (
+    get_chat_messages_from_history,
+    convert_history_to_contents,
+)
+
+HISTORY_DATABASE_URL = os.getenv("CHAT_HISTORY_DATABASE_URL", "sqlite:///chat_history.db")
+HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", 40))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 4000))
+HISTORY_CACHED_CHATS = int(os.getenv("CHAT_HISTORY_CACHED_CHATS", 5000))
+HISTORY_FLUSH_MAX_BATCH = int(os.getenv("CHAT_HISTORY_FLUSH_MAX_BATCH", 200))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL_MS", 200))
+HISTORY_FLUSH_MAX_ATTEMPTS = int(os.getenv("CHAT_HISTORY_FLUSH_MAX_ATTEMPTS", 5))
+
+# Rough token estimate used for budgeting; avoids a tokenizer call on the hot path
+CHARS_PER_TOKEN = 4
+
+metadata = MetaData()
+
+chat_history = Table(
+    "chat_history",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", String(128), nullable=False),
+    Column("agent", String(64), nullable=False),
+    Column("seq", Integer, nullable=False),
+    Column("message", Text, nullable=False),  # one history message as JSON
+    Column("tokens", Integer, nullable=False),
+    Column("created_at", DateTime, default=datetime.now),
+    Index("ix_chat_history_chat_agent_seq", "chat_id", "agent", "seq", unique=True),
+)
+
+
+def _column_values(row: dict) -> dict:
+    """The table's columns of a buffered row, without its bookkeeping"""
+    return {name: row[name] for name in ("chat_id", "agent", "seq", "message", "tokens")}
+
+
+def estimate_tokens(message: dict) -> int:
+    return len(json.dumps(message)) // CHARS_PER_TOKEN + 1
+
+
+class HistoryStore:
+    def __init__(self, database_url: str = HISTORY_DATABASE_URL, max_cached_chats: int = HISTORY_CACHED_CHATS,
+                 flush_max_batch: int = HISTORY_FLUSH_MAX_BATCH, flush_interval_ms: float = HISTORY_FLUSH_INTERVAL_MS,
+                 flush_max_attempts: int = HISTORY_FLUSH_MAX_ATTEMPTS):
+        self.engine = create_engine(database_url, pool_pre_ping=True)
+        metadata.create_all(self.engine)
+        self.max_cached_chats = max_cached_chats
+        # (chat_id, agent) -> [(seq, tokens, Content)], oldest first
+        self._contents: "OrderedDict[Tuple[str, str], List[tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Write-behind state, guarded by _write_lock
+        self.flush_max_batch = flush_max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_attempts = flush_max_attempts
+        self.dropped = 0  # rows given up on after flush_max_attempts
+        self._write_lock = threading.Condition()
+        self._buffer: List[dict] = []  # rows waiting for the next bulk insert
+        self._unflushed: Dict[Tuple[str, str], List[list]] = {}  # [seq, tokens, message] that reads must still see
+        self._last_seqs: "OrderedDict[Tuple[str, str], int]" = OrderedDict()  # last seq assigned per chat
+        self._after_flush: List[Callable[[], None]] = []
+        self._stopped = False
+        self._writer = threading.Thread(target=self._writer_loop, name="chat-history-writer", daemon=True)
+        self._writer.start()
+
+    def _stored_max_seq(self, conn, key: Tuple[str, str]) -> int:
+        return conn.execute(
+            select(func.max(chat_history.c.seq)).where(
+                and_(chat_history.c.chat_id == key[0], chat_history.c.agent == key[1])
+            )
+        ).scalar() or 0
+
+    def _remember_last_seq(self, key: Tuple[str, str], seq: int):
+        """Record the last seq assigned to a chat; caller holds _write_lock"""
+        self._last_seqs[key] = max(seq, self._last_seqs.get(key, 0))
+        self._last_seqs.move_to_end(key)
+        while len(self._last_seqs) > self.max_cached_chats:
+            self._last_seqs.popitem(last=False)
+
+    def _rows(self, chat_id: str, agent: str, messages: List[dict]) -> List[dict]:
+        """
+        Rows for messages that go after the chat's stored and still buffered ones.
+
+        The stored max seq is read from the table once per chat and then counted on in
+        memory, so appends don't wait on the database. Rows whose seq another process
+        took in the meantime are moved after the stored ones when they are flushed.
+        """
+        key = (chat_id, agent)
+        with self._write_lock:
+            known = key in self._last_seqs
+        stored = 0
+        if not known:
+            with self.engine.connect() as conn:
+                stored = self._stored_max_seq(conn, key)
+        with self._write_lock:
+            last_seq = max(stored, self._last_seqs.get(key, 0))
+            pending = self._unflushed.get(key)
+            if pending:
+                last_seq = max(last_seq, pending[-1][0])
+            self._remember_last_seq(key, last_seq + len(messages))
+            rows = []
+            for i, message in enumerate(messages):
+                # The entry is what reads see until the row is stored; it follows the row if its seq changes
+                entry = [last_seq + 1 + i, estimate_tokens(message), message]
+                rows.append({
+                    "chat_id": chat_id,
+                    "agent": agent,
+                    "seq": entry[0],
+                    "message": json.dumps(message),
+                    "tokens": entry[1],
+                    "entry": entry,
+                    "attempts": 0,
+                })
+            return rows
+
+    def append(self, chat_id: str, agent: str, messages: List[dict]):
+        """Store messages after the chat's existing ones, synchronously"""
+        if not messages:
+            return
+        rows = self._rows(chat_id, agent, messages)
+        if not self._insert_chat_rows((chat_id, agent), rows):
+            raise RuntimeError(f"could not store {len(rows)} history messages for {agent}")
+
+    def append_later(self, chat_id: str, agent: str, messages: List[dict], after_flush: Optional[Callable[[], None]] = None):
+        """
+        Buffer messages for the background writer and return immediately.
+
+        Args:
+            chat_id: The chat the messages belong to
+            agent: The agent whose history they are
+            messages: History messages, in order
+            after_flush: Optional extra write to run on the writer thread once the batch is stored
+        """
+        rows = self._rows(chat_id, agent, messages) if messages else []
+        with self._write_lock:
+            if rows:
+                self._buffer.extend(rows)
+                self._unflushed.setdefault((chat_id, agent), []).extend(row["entry"] for row in rows)
+            if after_flush is not None:
+                self._after_flush.append(after_flush)
+            if len(self._buffer) >= self.flush_max_batch:
+                self._write_lock.notify()
+
+    def _writer_loop(self):
+        while True:
+            with self._write_lock:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopped and len(self._buffer) < self.flush_max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._write_lock.wait(remaining)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def _resequence(self, conn, key: Tuple[str, str], rows: List[dict]):
+        """Move a chat's rows after everything stored for it, keeping their order"""
+        last_seq = self._stored_max_seq(conn, key)
+        with self._write_lock:
+            for i, row in enumerate(rows):
+                row["seq"] = row["entry"][0] = last_seq + 1 + i
+            self._remember_last_seq(key, last_seq + len(rows))
+        # Cached contents may hold the old seqs
+        with self._lock:
+            self._contents.pop(key, None)
+
+    def _insert_chat_rows(self, key: Tuple[str, str], rows: List[dict]) -> bool:
+        """
+        Insert one chat's rows in a transaction. If their seqs were taken in the
+        meantime (another process wrote to the chat), they are moved after the stored
+        rows and inserted once more.
+        """
+        for attempt in range(2):
+            try:
+                with self.engine.begin() as conn:
+                    if attempt:
+                        self._resequence(conn, key, rows)
+                    conn.execute(chat_history.insert(), [_column_values(row) for row in rows])
+                return True
+            except IntegrityError:
+                logger.warning(f"history seq clash for {key[1]}, {'giving up' if attempt else 'resequencing'}")
+            except Exception:
+                logger.error(f"writing {len(rows)} history messages for {key[1]} failed", exc_info=True)
+                return False
+        return False
+
+    def _insert(self, rows: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """
+        Insert rows with one bulk insert, falling back to one transaction per chat and
+        then per row so a bad row can't hold back the others.
+
+        Returns:
+            tuple: (rows to retry on the next flush, rows dropped after too many attempts)
+        """
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(chat_history.insert(), [_column_values(row) for row in rows])
+            return [], []
+        except Exception:
+            logger.warning(f"bulk insert of {len(rows)} history messages failed, writing them per chat", exc_info=True)
+
+        by_chat: "OrderedDict[Tuple[str, str], List[dict]]" = OrderedDict()
+        for row in rows:
+            by_chat.setdefault((row["chat_id"], row["agent"]), []).append(row)
+
+        retry, dropped = [], []
+        for key, chat_rows in by_chat.items():
+            if self._insert_chat_rows(key, chat_rows):
+                continue
+            for row in chat_rows:
+                if self._insert_chat_rows(key, [row]):
+                    continue
+                row["attempts"] += 1
+                if row["attempts"] < self.flush_max_attempts:
+                    retry.append(row)
+                else:
+                    logger.error(f"dropping history message {row['seq']} of {key[1]} for chat {key[0]!r} "
+                                 f"after {row['attempts']} failed attempts: {row['message'][:500]}")
+                    dropped.append(row)
+        return retry, dropped
+
+    def flush(self):
+        """Write everything buffered, then run the queued after-flush writes"""
+        with self._write_lock:
+            rows, self._buffer = self._buffer, []
+            after_flush, self._after_flush = self._after_flush, []
+        if rows:
+            start = time.perf_counter()
+            retry, dropped = self._insert(rows)
+            self.dropped += len(dropped)
+            logger.debug(f"flushed {len(rows) - len(retry) - len(dropped)} history messages "
+                         f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+            with self._write_lock:
+                self._buffer[:0] = retry
+                # Stored and dropped rows are no longer served from memory
+                done = {id(row["entry"]) for row in rows} - {id(row["entry"]) for row in retry}
+                for key in {(row["chat_id"], row["agent"]) for row in rows}:
+                    remaining = [entry for entry in self._unflushed.get(key, []) if id(entry) not in done]
+                    if remaining:
+                        self._unflushed[key] = remaining
+                    else:
+                        self._unflushed.pop(key, None)
+
+        # The legacy history is a separate store; its writes don't wait on these rows
+        for write in after_flush:
+            try:
+                write()
+            except Exception:
+                logger.error("deferred history write failed", exc_info=True)
+
+    def close(self):
+        """Stop the writer after a final flush"""
+        with self._write_lock:
+            self._stopped = True
+            self._write_lock.notify()
+        self._writer.join(timeout=10)
+
+    def get_recent(self, chat_id: str, agent: str, max_messages: int = HISTORY_MAX_MESSAGES,
+                   token_budget: int = HISTORY_TOKEN_BUDGET, after_seq: int = 0) -> List[Tuple[int, int, dict]]:
+        """
+        Return the newest messages of a chat that fit the budget, oldest first.
+
+        Reads at most max_messages rows through the (chat_id, agent, seq) index, newest
+        first, and stops at the first message that would exceed token_budget.
+
+        Returns:
+            list: (seq, tokens, message) tuples
+        """
+        return self._recent(chat_id, agent, max_messages, token_budget, after_seq)[0]
+
+    def _recent(self, chat_id: str, agent: str, max_messages: int, token_budget: int,
+                after_seq: int) -> Tuple[List[Tuple[int, int, dict]], bool]:
+        """get_recent, also telling whether older messages after after_seq were left out"""
+        # Snapshot the buffer before reading the table: a batch flushed in between is then
+        # seen twice (and deduplicated) rather than not at all
+        with self._write_lock:
+            pending = [tuple(entry) for entry in self._unflushed.get((chat_id, agent), []) if entry[0] > after_seq]
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(chat_history.c.seq, chat_history.c.tokens, chat_history.c.message)
+                .where(and_(
+                    chat_history.c.chat_id == chat_id,
+                    chat_history.c.agent == agent,
+                    chat_history.c.seq > after_seq,
+                ))
+                .order_by(chat_history.c.seq.desc())
+                .limit(max_messages)
+            ).fetchall()
+
+        if pending:
+            stored = [(seq, tokens, json.loads(message)) for seq, tokens, message in rows]
+            seen = {entry[0] for entry in pending}
+            newest = sorted(pending + [entry for entry in stored if entry[0] not in seen], key=lambda entry: entry[0], reverse=True)
+            rows = [(seq, tokens, message) for seq, tokens, message in newest[:max_messages]]
+        else:
+            rows = [(seq, tokens, json.loads(message)) for seq, tokens, message in rows]
+
+        truncated = len(rows) >= max_messages
+        recent = []
+        for seq, tokens, message in rows:
+            if tokens > token_budget:
+                truncated = True
+                break
+            token_budget -= tokens
+            recent.append((seq, tokens, message))
+        recent.reverse()
+        return recent, truncated
+
+    def _backfill(self, chat_id: str, agent: str):
+        """Copy a chat's legacy history into the table the first time it is read"""
+        with span("history_backfill", agent=agent) as backfill_span:
+            legacy = get_chat_messages_from_history(agent_name=agent)
+            if backfill_span is not None:
+                backfill_span.set(messages=len(legacy or []))
+            if legacy:
+                logger.info(f"backfilling {len(legacy)} history messages for {agent}")
+                self.append(chat_id, agent, legacy)
+
+    def get_contents(self, chat_id: str, agent: str, max_messages: int = HISTORY_MAX_MESSAGES,
+                     token_budget: int = HISTORY_TOKEN_BUDGET) -> list:
+        """
+        Return the chat's recent history as Content objects, within max_messages and token_budget.
+
+        Only messages stored since the previous call for this chat and agent are read and
+        converted; the rest come from the per-chat cache.
+        """
+        key = (chat_id, agent)
+        with self._lock:
+            cached = list(self._contents.get(key, []))
+        last_seq = cached[-1][0] if cached else 0
+
+        new, truncated = self._recent(chat_id, agent, max_messages, token_budget, last_seq)
+        if not cached and not new:
+            self._backfill(chat_id, agent)
+            new = self.get_recent(chat_id, agent, max_messages, token_budget)
+        if truncated:
+            # Messages between the cached ones and the new ones were cut by the limits;
+            # joining the two would leave a gap in the middle of the history
+            cached = []
+
+        if new:
+            converted = convert_history_to_contents([message for _, _, message in new])
+            if len(converted) == len(new):
+                cached += [(seq, tokens, content) for (seq, tokens, _), content in zip(new, converted)]
+            else:
+                # The conversion merged or split messages; spread their tokens over its output
+                share = sum(tokens for _, tokens, _ in new) // max(len(converted), 1) + 1
+                cached += [(new[-1][0], share, content) for content in converted]
+
+        # Trim the window to the newest messages within the limits
+        window = []
+        budget = token_budget
+        for entry in reversed(cached[-max_messages:]):
+            if entry[1] > budget:
+                break
+            budget -= entry[1]
+            window.append(entry)
+        window.reverse()
+        # Gemini expects the history to open with a user turn
+        while window and getattr(window[0][2], "role", None) == "model":
+            window.pop(0)
+
+        with self._lock:
+            self._contents[key] = window
+            self._contents.move_to_end(key)
+            while len(self._contents) > self.max_cached_chats:
+                self._contents.popitem(last=False)
+        return [content for _, _, content in window]
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+                # Flush what is still buffered on graceful shutdown
+                atexit.register(_store.close)
+    return _store
+
+
+def get_history_contents(agent_name: str, **kwargs) -> list:
+    """Recent history of the current chat for an agent, as Content objects"""
+    with span("history_read", agent=agent_name) as read_span:
+        contents = get_history_store().get_contents(get_chat_id(), agent_name, **kwargs)
+        if read_span is not None:
+            read_span.set(messages=len(contents))
+        return contents
+
+
+def save_history_messages(agent_name: str, messages: List[dict], after_flush: Optional[Callable[[], None]] = None):
+    """
+    Append messages to the current chat's history for an agent, write-behind.
+
+    after_flush runs on the writer thread with the caller's context variables (e.g. the
+    chat id), so existing per-chat writers can be moved off the request path too.
+    """
+    if after_flush is not None:
+        context = contextvars.copy_context()
+        write = after_flush
+        after_flush = lambda: context.run(write)
+    with span("history_write", agent=agent_name, messages=len(messages)):
+        get_history_store().append_later(get_chat_id(), agent_name, messages, after_flush)
@@ -0,0 +1,183 @@
+"""
+Deadline budget, hard timeout and circuit breaker for the concierge's Gemini calls.
+
+A concierge turn gets a time budget (CONCIERGE_TURN_BUDGET_SECONDS) that is shared by
+the model call and the talk_to_* tools it calls through automatic function calling.
+The model call runs on a small pool so the caller stops waiting when the budget runs
+out, and a circuit breaker fails turns fast while Gemini is erroring or slow.
+"""
+
+import os
+import time
+import threading
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional, Any
+from agents.config import logger
+
+TURN_BUDGET_SECONDS = float(os.getenv("CONCIERGE_TURN_BUDGET_SECONDS", 45))
+BREAKER_WINDOW = int(os.getenv("CONCIERGE_BREAKER_WINDOW", 20))
+BREAKER_MIN_CALLS = int(os.getenv("CONCIERGE_BREAKER_MIN_CALLS", 5))
+BREAKER_FAILURE_RATE = float(os.getenv("CONCIERGE_BREAKER_FAILURE_RATE", 0.5))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CONCIERGE_BREAKER_SLOW_CALL_SECONDS", 20))
+BREAKER_SLOW_CALL_RATE = float(os.getenv("CONCIERGE_BREAKER_SLOW_CALL_RATE", 0.8))
+BREAKER_OPEN_SECONDS = float(os.getenv("CONCIERGE_BREAKER_OPEN_SECONDS", 30))
+# Timeouts of calls given less time than this don't count against the upstream
+BREAKER_MIN_BUDGET_SECONDS = float(os.getenv("CONCIERGE_BREAKER_MIN_BUDGET_SECONDS", 1))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a turn's time budget runs out before a call finishes"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("concierge_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float = TURN_BUDGET_SECONDS):
+    """Give the enclosed turn a time budget; a nested scope (e.g. a sub-agent) can only shorten it"""
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        expires_at = min(expires_at, outer)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current turn's budget, or None outside a turn"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(expires_at - time.monotonic(), 0.0)
+
+
+def budget_exhausted() -> bool:
+    """True when called inside a turn whose budget has run out"""
+    remaining = remaining_budget()
+    return remaining is not None and remaining <= 0
+
+
+def skip_when_budget_exhausted(func: Callable) -> Callable:
+    """Decorator for talk_to_* tools: answer without calling the team member once the turn's budget is gone"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if budget_exhausted():
+            logger.warning(f"{func.__name__} skipped: the turn's time budget is exhausted")
+            return "The internal team member could not be reached in time"
+        return func(*args, **kwargs)
+    return wrapper
+
+
+class CircuitBreaker:
+    """
+    Opens when the share of failed (error or timeout) or slow calls among the last
+    `window` calls crosses its threshold, rejects calls for `open_seconds`, then lets a
+    single trial call through to decide whether to close again.
+    """
+
+    def __init__(self, name: str, max_workers: int = 16):
+        self.name = name
+        self.state = "closed"
+        self.stats = {"calls": 0, "errors": 0, "timeouts": 0, "rejections": 0, "opened": 0, "deadline_skips": 0}
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-call")
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"{self.name} circuit breaker {self.state} -> {state}")
+            self.state = state
+            if state == "open":
+                self.stats["opened"] += 1
+                self._opened_at = time.monotonic()
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < BREAKER_OPEN_SECONDS:
+                    self.stats["rejections"] += 1
+                    return False
+                self._set_state("half_open")
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    self.stats["rejections"] += 1
+                    return False
+                self._trial_in_flight = True
+            self.stats["calls"] += 1
+            return True
+
+    def _record(self, failed: bool, elapsed: float):
+        slow = elapsed >= BREAKER_SLOW_CALL_SECONDS
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_in_flight = False
+                self._outcomes.clear()
+                self._set_state("open" if failed or slow else "closed")
+                return
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < BREAKER_MIN_CALLS:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if failures / calls >= BREAKER_FAILURE_RATE or slow_calls / calls >= BREAKER_SLOW_CALL_RATE:
+                self._outcomes.clear()
+                self._set_state("open")
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Run func within the remaining turn budget; raises CircuitOpenError or DeadlineExceeded"""
+        timeout = remaining_budget()
+        if timeout is not None and timeout <= 0:
+            with self._lock:
+                self.stats["deadline_skips"] += 1
+            raise DeadlineExceeded(f"{self.name} call skipped: the turn's time budget is exhausted")
+        if not self._allow():
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        start = time.monotonic()
+        # copy_context keeps the chat id, interface and deadline visible to the tools
+        future = self._executor.submit(contextvars.copy_context().run, func)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.stats["timeouts"] += 1
+            if timeout >= BREAKER_MIN_BUDGET_SECONDS:
+                self._record(True, time.monotonic() - start)
+            else:
+                # Too little time to judge the upstream by; only end a half-open trial
+                with self._lock:
+                    self._trial_in_flight = False
+            raise DeadlineExceeded(f"{self.name} call did not finish within {timeout:.1f}s")
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            self._record(True, time.monotonic() - start)
+            raise
+        self._record(False, time.monotonic() - start)
+        return result
+
+    def get_metrics(self) -> dict:
+        """Breaker state and call/timeout counts, for logging or a metrics endpoint"""
+        with self._lock:
+            return {"state": self.state, **self.stats}
+
+
+gemini_breaker = CircuitBreaker("concierge_gemini")
+# The light model has its own breaker, so its failures don't open the full model's
+gemini_light_breaker = CircuitBreaker("concierge_gemini_light")
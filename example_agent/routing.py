@@ -0,0 +1,100 @@
+"""
+Latency-aware routing of concierge turns between a light and the full model.
+
+Most concierge turns need a team member (a talk_to_* tool) and go to the full model
+with the tools. Messages that are only small talk (greetings, thanks) are answered by
+a lighter model without tools, which can hand the turn back with ESCALATE_MARKER;
+failures and hand-backs are retried on the full model and counted as escalated.
+"""
+
+import os
+import re
+import threading
+from typing import Optional, Tuple
+
+LIGHT = "light"
+FULL = "full"
+ESCALATED = "escalated"
+ROUTES = (LIGHT, FULL, ESCALATED)
+
+ROUTING_ENABLED = os.getenv("CONCIERGE_ROUTING", "true").lower() == "true"
+LIGHT_MODEL = os.getenv("CONCIERGE_LIGHT_MODEL", "gemini-2.0-flash-lite")
+LIGHT_MAX_CHARS = int(os.getenv("CONCIERGE_LIGHT_MAX_CHARS", 80))
+LIGHT_TIMEOUT_SECONDS = float(os.getenv("CONCIERGE_LIGHT_TIMEOUT_SECONDS", 5))
+
+ESCALATE_MARKER = "ESCALATE"
+LIGHT_INSTRUCTIONS = f"""
+
+# This reply
+You cannot consult any internal team member for this reply. Answer greetings, thanks and small talk briefly and ask how you can help.
+If the message needs any data or action (prices, trucks, orders, buyers, quality, accounts, news), reply with only the word {ESCALATE_MARKER}.
+"""
+
+# Anything about the team members' domains needs a tool
+TOOL_INTENT = re.compile(
+    r"\b(price|rates?|bhav|mandi|market|commodit\w*|crop|truck|vehicle|track\w*|location|po|orders?|"
+    r"buyers?|sellers?|leads?|quality|inspect\w*|account|manager|payments?|invoice|search|news|weather)\b",
+    re.IGNORECASE,
+)
+# A message made only of these phrases (with punctuation or emoji around them) is small
+# talk. Yes/no are left out: they usually answer a team member's question.
+SMALL_TALK_PHRASE = (
+    r"(hi+|hey+|hello+|hola|namaste|namaskar|ram ram|good (morning|afternoon|evening|night)|"
+    r"thanks?( you)?|thank u|thx|ty|dhanyavaad|shukriya|ok(ay)?|k|cool|great|nice|got it|"
+    r"theek hai|bye|goodbye|there|sir|ji|bhai|so much|a lot)"
+)
+SMALL_TALK = re.compile(rf"[\W_]*{SMALL_TALK_PHRASE}([\W_]+{SMALL_TALK_PHRASE})*[\W_]*", re.IGNORECASE)
+
+_stats_lock = threading.Lock()
+_stats = {route: {"turns": 0, "latency_ms": 0.0} for route in ROUTES}
+_stats["light_failures"] = 0
+
+
+def classify_turn(text: Optional[str], has_media: bool = False) -> Tuple[str, str]:
+    """
+    Pick the route for a turn from the user's message alone.
+
+    Returns:
+        tuple: (route, reason)
+    """
+    text = (text or "").strip()
+    if not ROUTING_ENABLED:
+        return FULL, "routing_disabled"
+    if has_media:
+        return FULL, "media"
+    if not text:
+        return FULL, "empty"
+    if len(text) > LIGHT_MAX_CHARS:
+        return FULL, "long"
+    if re.search(r"\d", text):
+        return FULL, "number"
+    if TOOL_INTENT.search(text):
+        return FULL, "tool_intent"
+    if SMALL_TALK.fullmatch(text):
+        return LIGHT, "small_talk"
+    return FULL, "default"
+
+
+def record_route(route: str, elapsed_ms: float):
+    """Count a finished turn and its latency under the route that answered it"""
+    with _stats_lock:
+        _stats[route]["turns"] += 1
+        _stats[route]["latency_ms"] += elapsed_ms
+
+
+def record_light_failure():
+    with _stats_lock:
+        _stats["light_failures"] += 1
+
+
+def get_route_metrics() -> dict:
+    """Share of turns and average latency per route, and how often the light model failed"""
+    with _stats_lock:
+        stats = {route: dict(_stats[route]) for route in ROUTES}
+        light_failures = _stats["light_failures"]
+    total = sum(route["turns"] for route in stats.values())
+    for route in stats.values():
+        route["share"] = route["turns"] / total if total else 0.0
+        route["latency_ms_avg"] = route["latency_ms"] / route["turns"] if route["turns"] else 0.0
+    stats["light_failures"] = light_failures
+    return stats
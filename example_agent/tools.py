@@ -3,11 +3,15 @@ from typing import Optional
 from agents.feature_flags import FeatureFlags
 from agents.config import logger
 from agents.common.utils import UserRequest
+from agents.microagents.concierge.resilience import skip_when_budget_exhausted
+from agents.microagents.concierge.tracing import traced
 from agents.microagents.web_search_agent.prompts import (
     system_instruction as web_search_system_instruction,
 )
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_market_rates_agent(
     query: str, media_url: Optional[str] = None, mime_type: Optional[str] = None
 ) -> json:
@@ -37,6 +41,8 @@ def talk_to_market_rates_agent(
     return response
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_vehicle_tracking_agent(
     query: str, media_url: Optional[str] = None, mime_type: Optional[str] = None
 ) -> json:
@@ -71,6 +77,8 @@ def talk_to_vehicle_tracking_agent(
     return response
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_account_manager_agent(
     query: str, media_url: Optional[str] = None, mime_type: Optional[str] = None
 ) -> json:
@@ -108,6 +116,8 @@ def talk_to_account_manager_agent(
     return response
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_buyer_leads_generation_agent(
     query: str, media_url: Optional[str] = None, mime_type: Optional[str] = None
 ) -> json:
@@ -135,6 +145,8 @@ def talk_to_buyer_leads_generation_agent(
         return "Feature flag is not enabled"
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_commodity_quality_inspector_agent(
     query: str, media_url: str, mime_type: str
 ) -> json:
@@ -170,6 +182,8 @@ def talk_to_commodity_quality_inspector_agent(
         return "Feature flag is not enabled"
 
 
+@traced()
+@skip_when_budget_exhausted
 def talk_to_web_search_agent(
     query: str, media_url: Optional[str] = None, mime_type: Optional[str] = None
 ) -> json:
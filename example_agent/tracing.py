@@ -0,0 +1,146 @@
+"""
+Span tracing for concierge turns.
+
+Each turn produces a timing tree: the turn's root span holds the history reads and
+writes, every model call (with its token usage) and every talk_to_* tool the model
+called, with whatever the sub-agents trace nested below their tool. Spans follow the
+context variables, so tools dispatched on other threads with a copied context still
+attach to the turn.
+
+Finished traces are kept in an in-memory ring buffer (CONCIERGE_TRACE_BUFFER_SIZE) for
+get_recent_traces, and appended as JSON lines to CONCIERGE_TRACE_FILE when it is set.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from agents.config import logger
+
+TRACING_ENABLED = os.getenv("CONCIERGE_TRACING", "true").lower() == "true"
+TRACE_BUFFER_SIZE = int(os.getenv("CONCIERGE_TRACE_BUFFER_SIZE", 200))
+TRACE_FILE = os.getenv("CONCIERGE_TRACE_FILE")
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        """Add attributes, e.g. token usage once the model has answered"""
+        self.attributes.update(attributes)
+
+    def _add_child(self, child: "Span"):
+        # Children of one span can be added from several tool threads at once
+        with self._lock:
+            self.children.append(child)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            children = list(self.children)
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            # A child still running when its parent was exported has no duration yet
+            "duration_ms": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in children],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("concierge_span", default=None)
+_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+_file_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as a child of the current span, or as a new trace.
+
+    Yields:
+        Span: The span, to add attributes to (None when tracing is off)
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.trace_id if parent else uuid.uuid4().hex, attributes)
+    if parent is not None:
+        parent._add_child(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current._start) * 1000
+        _current_span.reset(token)
+        if parent is None:
+            _export(current)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator that runs the function inside a span (named after the function by default)"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _export(root: Span):
+    trace = {"trace_id": root.trace_id, **root.to_dict()}
+    with _traces_lock:
+        _traces.append(trace)
+    logger.debug(f"trace {root.trace_id}: {root.name} took {root.duration_ms:.0f}ms")
+    if TRACE_FILE:
+        try:
+            line = json.dumps(trace, default=str)
+            with _file_lock, open(TRACE_FILE, "a") as f:
+                f.write(line + "\n")
+        except Exception:
+            logger.error(f"writing trace {root.trace_id} to {TRACE_FILE} failed", exc_info=True)
+
+
+def get_recent_traces(limit: int = 20, min_duration_ms: float = 0) -> List[dict]:
+    """
+    The newest finished traces, newest first.
+
+    Args:
+        limit: Traces to return
+        min_duration_ms: Only traces at least this slow, to find where slow turns spend their time
+    """
+    with _traces_lock:
+        traces = list(_traces)
+    slow = [trace for trace in reversed(traces) if (trace["duration_ms"] or 0) >= min_duration_ms]
+    return slow[:limit]
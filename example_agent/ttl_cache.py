@@ -0,0 +1,126 @@
+"""
+TTL cache with stale-while-revalidate and per-key single-flight.
+
+Used for lookups on the concierge's critical path whose results rarely change (dynamic
+prompts, chat identities). A fresh entry is returned as is. An entry past its TTL but
+within the stale window is returned immediately while one background refresh reloads
+it. Only a missing or fully expired entry makes the caller wait, and concurrent callers
+for the same key share a single load instead of stampeding the backing store.
+"""
+
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+from agents.config import logger
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ttl-cache-refresh")
+
+
+class TTLCache:
+    """
+    Args:
+        name: Used in logs and metrics
+        ttl: Seconds an entry is served without reloading
+        stale_ttl: Further seconds an entry is still served while it is refreshed in the background
+        max_size: Entries kept, least recently used evicted first
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float, max_size: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, loaded_at)
+        self._loading: dict = {}  # key -> Future of the load in flight
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0,
+            "refreshes": 0, "errors": 0, "blocked_ms": 0.0,
+        }
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the value for key, loading it with loader() if needed"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = now - loaded_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    if key not in self._loading:
+                        self._start_load(key, loader, background=True)
+                    return value
+
+            # Missing or too old to serve: wait for a load, joining one already in flight
+            future = self._loading.get(key)
+            if future is None:
+                self._stats["misses"] += 1
+                future = self._start_load(key, loader, background=False)
+                owner = True
+            else:
+                self._stats["coalesced"] += 1
+                owner = False
+
+        start = time.perf_counter()
+        try:
+            if owner:
+                self._load(key, loader, future)
+            return future.result()
+        finally:
+            with self._lock:
+                self._stats["blocked_ms"] += (time.perf_counter() - start) * 1000
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Any], background: bool) -> Future:
+        """Register a load for key (called with the lock held)"""
+        future = Future()
+        self._loading[key] = future
+        if background:
+            self._stats["refreshes"] += 1
+            _refresh_executor.submit(contextvars.copy_context().run, self._load, key, loader, future)
+        return future
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], future: Future):
+        try:
+            value = loader()
+        except Exception as e:
+            logger.error(f"{self.name} cache: loading {key!r} failed", exc_info=True)
+            with self._lock:
+                self._stats["errors"] += 1
+                self._loading.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._loading.pop(key, None)
+        future.set_result(value)
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one entry, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_metrics(self) -> dict:
+        """Hit counts, hit rate (fresh and stale hits) and the average time lookups blocked callers"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        stats["blocked_ms_per_lookup"] = stats["blocked_ms"] / lookups if lookups else 0.0
+        return stats
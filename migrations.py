@@ -0,0 +1,108 @@
+from datetime import datetime
+from sqlalchemy import text
+from models import db
+from logger import logger
+
+# Ordered list of (version, description, statements). Never edit a released migration;
+# append a new one instead. Statements must be safe to run on a database created by
+# db.create_all() from the current models, since fresh databases get them too.
+MIGRATIONS = [
+    (1, "Add indexes for listing and lookup paths", [
+        "CREATE INDEX IF NOT EXISTS ix_application_job_id_id ON application (job_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_application_status_id ON application (status, id)",
+        "CREATE INDEX IF NOT EXISTS ix_application_whatsapp_number ON application (whatsapp_number)",
+        "CREATE INDEX IF NOT EXISTS ix_question_job_id_id ON question (job_id, id)",
+        "CREATE INDEX IF NOT EXISTS ix_answer_application_id_id ON answer (application_id, id)",
+    ]),
+    (2, "Add processed_message table for webhook deduplication", [
+        "CREATE TABLE IF NOT EXISTS processed_message (message_id VARCHAR(128) NOT NULL PRIMARY KEY, seen_at TIMESTAMP NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_processed_message_seen_at ON processed_message (seen_at)",
+    ]),
+    (3, "Add catalog_version counter shared by worker processes", [
+        "CREATE TABLE IF NOT EXISTS catalog_version (id INTEGER NOT NULL PRIMARY KEY, version INTEGER NOT NULL)",
+        "INSERT INTO catalog_version (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_version WHERE id = 1)",
+    ]),
+    (4, "Add conversation memory tables for the HR agent", [
+        "CREATE TABLE IF NOT EXISTS conversation_turn (id INTEGER NOT NULL PRIMARY KEY, phone_number VARCHAR(20) NOT NULL, "
+        "role VARCHAR(10) NOT NULL, text TEXT NOT NULL, created_at TIMESTAMP)",
+        "CREATE INDEX IF NOT EXISTS ix_conversation_turn_phone_number_id ON conversation_turn (phone_number, id)",
+        "CREATE TABLE IF NOT EXISTS conversation_summary (phone_number VARCHAR(20) NOT NULL PRIMARY KEY, summary TEXT NOT NULL, "
+        "summarized_through INTEGER NOT NULL, updated_at TIMESTAMP)",
+    ]),
+    (5, "Add skill dictionary and application skill links", [
+        "CREATE TABLE IF NOT EXISTS skill (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS application_skill (application_id INTEGER NOT NULL REFERENCES application (id), "
+        "skill_id INTEGER NOT NULL REFERENCES skill (id), PRIMARY KEY (application_id, skill_id))",
+        "CREATE INDEX IF NOT EXISTS ix_application_skill_skill_id ON application_skill (skill_id)",
+    ]),
+    (6, "Add ai_analysis table for application analyses", [
+        "CREATE TABLE IF NOT EXISTS ai_analysis (id INTEGER NOT NULL PRIMARY KEY, "
+        "application_id INTEGER NOT NULL UNIQUE REFERENCES application (id), analysis_text TEXT NOT NULL, "
+        "key_strengths TEXT, match_score FLOAT, created_at TIMESTAMP, updated_at TIMESTAMP)",
+    ]),
+]
+
+_CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+def get_applied_versions(connection) -> set:
+    """Return the set of migration versions already applied to the database"""
+    connection.execute(text(_CREATE_VERSION_TABLE))
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _record_version(connection, version: int, description: str):
+    connection.execute(
+        text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:version, :description, :applied_at)"),
+        {"version": version, "description": description, "applied_at": datetime.now()}
+    )
+
+
+def run_migrations(app) -> bool:
+    """
+    Apply all pending migrations in place, each in its own transaction.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        bool: True if the database is up to date, False if a migration failed
+    """
+    with app.app_context():
+        with db.engine.begin() as connection:
+            applied = get_applied_versions(connection)
+
+        pending = [m for m in MIGRATIONS if m[0] not in applied]
+        if not pending:
+            logger.info("Database schema is up to date")
+            return True
+
+        for version, description, statements in pending:
+            try:
+                logger.info(f"Applying migration {version}: {description}")
+                with db.engine.begin() as connection:
+                    for statement in statements:
+                        connection.execute(text(statement))
+                    _record_version(connection, version, description)
+            except Exception:
+                logger.error(f"Error applying migration {version}", exc_info=True)
+                return False
+
+        logger.info(f"Applied {len(pending)} migration(s)")
+        return True
+
+
+def stamp_migrations(app):
+    """Mark every migration as applied, for a database just created from the current models"""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            applied = get_applied_versions(connection)
+            for version, description, _ in MIGRATIONS:
+                if version not in applied:
+                    _record_version(connection, version, description)
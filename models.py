@@ -31,6 +31,10 @@ class Job(db.Model):
         }
 
 class Question(db.Model):
+    __table_args__ = (
+        db.Index('ix_question_job_id_id', 'job_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
     text = db.Column(db.String(255), nullable=False)
@@ -43,7 +47,21 @@ class Question(db.Model):
             'required': self.required
         }
 
+# Skills extracted by AI analysis, linked to the applications that mention them
+application_skill = db.Table(
+    'application_skill',
+    db.Column('application_id', db.Integer, db.ForeignKey('application.id'), primary_key=True),
+    db.Column('skill_id', db.Integer, db.ForeignKey('skill.id'), primary_key=True),
+    db.Index('ix_application_skill_skill_id', 'skill_id'),
+)
+
 class Application(db.Model):
+    __table_args__ = (
+        db.Index('ix_application_job_id_id', 'job_id', 'id'),
+        db.Index('ix_application_status_id', 'status', 'id'),
+        db.Index('ix_application_whatsapp_number', 'whatsapp_number'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
     applicant_name = db.Column(db.String(100), nullable=False)
@@ -55,6 +73,7 @@ class Application(db.Model):
     
     # Relationships
     answers = db.relationship('Answer', backref='application', lazy=True, cascade="all, delete-orphan")
+    skills = db.relationship('Skill', secondary=application_skill, lazy=True)
     
     def to_dict(self):
         return {
@@ -70,6 +89,10 @@ class Application(db.Model):
         }
 
 class Answer(db.Model):
+    __table_args__ = (
+        db.Index('ix_answer_application_id_id', 'application_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
     question_text = db.Column(db.String(255), nullable=False)
@@ -82,3 +105,51 @@ class Answer(db.Model):
             'answer': self.answer_text,
             'required': self.required
         }
+
+class AIAnalysis(db.Model):
+    """The latest AI analysis of an application against its job's requirements"""
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, unique=True)
+    analysis_text = db.Column(db.Text, nullable=False)
+    key_strengths = db.Column(db.Text, nullable=True)
+    match_score = db.Column(db.Float, nullable=True)  # 0-100
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class Skill(db.Model):
+    """A skill name as first extracted by AI analysis; services.skills interns them case-insensitively"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+class ProcessedMessage(db.Model):
+    """WhatsApp message IDs already handled, shared by all workers for webhook deduplication"""
+    __table_args__ = (
+        db.Index('ix_processed_message_seen_at', 'seen_at'),
+    )
+
+    message_id = db.Column(db.String(128), primary_key=True)
+    seen_at = db.Column(db.DateTime, nullable=False)
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped on every job catalog write, shared by all worker processes"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ConversationTurn(db.Model):
+    """One message of the HR agent's WhatsApp conversation with a phone number"""
+    __table_args__ = (
+        db.Index('ix_conversation_turn_phone_number_id', 'phone_number', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20), nullable=False)
+    role = db.Column(db.String(10), nullable=False)  # user, model
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+class ConversationSummary(db.Model):
+    """Running summary of the conversation turns with a phone number up to summarized_through"""
+    phone_number = db.Column(db.String(20), primary_key=True)
+    summary = db.Column(db.Text, nullable=False)
+    summarized_through = db.Column(db.Integer, nullable=False)  # id of the last summarized ConversationTurn
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
@@ -1,6 +1,6 @@
-from flask import Blueprint, request, jsonify
-from models import db, Application, Job, Conversation, AIAnalysis, Skill
-from services.ai_service import analyze_with_ai
+from flask import Blueprint, request, jsonify, current_app
+from models import db, Application
+from services.analysis import run_analysis, save_analysis, analyze_applications
 from logger import logger
 
 ai = Blueprint('ai', __name__)
@@ -21,57 +21,13 @@ def analyze_application():
     logger.info(f"Analyzing application ID: {application_id}")
     
     try:
-        application = Application.query.get_or_404(application_id)
+        analysis_result = run_analysis(application_id)
+        if analysis_result is None:
+            logger.warning(f"Application not found with ID: {application_id}")
+            return jsonify({"msg": "Application not found"}), 404
         
-        # Get all conversation data
-        conversations = Conversation.query.filter_by(application_id=application_id).order_by(Conversation.timestamp).all()
-        logger.info(f"Retrieved {len(conversations)} conversation messages for analysis")
-        
-        conversation_text = "\n".join([f"{'Bot' if c.is_from_bot else 'Applicant'}: {c.message}" for c in conversations])
-        
-        # Extract job requirements
-        job = Job.query.get(application.job_id)
-        job_requirements = job.requirements
-        
-        # Call AI service to analyze the application
-        logger.info(f"Calling AI service to analyze application {application_id}")
-        analysis_result = analyze_with_ai(application, job_requirements, conversation_text)
-        logger.info(f"Received AI analysis with match score: {analysis_result['match_score']}")
-        
-        # Save or update the analysis
-        existing_analysis = AIAnalysis.query.filter_by(application_id=application_id).first()
-        
-        if existing_analysis:
-            logger.info(f"Updating existing analysis for application {application_id}")
-            existing_analysis.analysis_text = analysis_result['analysis']
-            existing_analysis.key_strengths = analysis_result['key_strengths']
-        else:
-            logger.info(f"Creating new analysis for application {application_id}")
-            new_analysis = AIAnalysis(
-                application_id=application_id,
-                analysis_text=analysis_result['analysis'],
-                key_strengths=analysis_result['key_strengths']
-            )
-            db.session.add(new_analysis)
-        
-        # Update match score
-        application.match_score = analysis_result['match_score']
-        
-        # Extract and save skills
-        skill_count = 0
-        for skill_name in analysis_result['skills']:
-            skill = Skill.query.filter_by(name=skill_name).first()
-            if not skill:
-                logger.info(f"Creating new skill: {skill_name}")
-                skill = Skill(name=skill_name)
-                db.session.add(skill)
-                db.session.flush()
-            
-            if skill not in application.skills:
-                application.skills.append(skill)
-                skill_count += 1
-        
-        logger.info(f"Added {skill_count} skills to application {application_id}")
+        application = Application.query.get(application_id)
+        save_analysis(application, analysis_result)
         
         db.session.commit()
         logger.info(f"Successfully saved analysis for application {application_id}")
@@ -85,4 +41,47 @@ def analyze_application():
         
     except Exception as e:
         logger.error(f"Error analyzing application {application_id}", exc_info=True)
-        return jsonify({"msg": f"Error analyzing application: {str(e)}"}), 500 
\ No newline at end of file
+        return jsonify({"msg": f"Error analyzing application: {str(e)}"}), 500 
+
+@ai.route('/analyze-applications', methods=['POST'])
+def analyze_applications_batch():
+    """
+    Analyze many applications at once, e.g. every candidate of a job that just closed.
+    
+    Body: {"application_ids": [...]} or {"job_id": ..., "status": optional}, and an
+    optional "concurrency" (at most ANALYSIS_MAX_CONCURRENCY).
+    """
+    if not request.is_json:
+        logger.warning("Batch analysis attempted with non-JSON request")
+        return jsonify({"msg": "Missing JSON in request"}), 400
+    
+    data = request.json
+    config = current_app.config
+    
+    if 'application_ids' in data:
+        application_ids = data['application_ids']
+        if not isinstance(application_ids, list) or not all(isinstance(i, int) for i in application_ids):
+            return jsonify({"msg": "application_ids must be a list of integers"}), 400
+    elif 'job_id' in data:
+        query = db.session.query(Application.id).filter(Application.job_id == data['job_id'])
+        if data.get('status'):
+            query = query.filter(Application.status == data['status'])
+        application_ids = [application_id for application_id, in query.order_by(Application.id)]
+    else:
+        logger.warning("Batch analysis attempted without application_ids or job_id")
+        return jsonify({"msg": "Missing application_ids or job_id field"}), 400
+    
+    if len(application_ids) > config['BULK_MAX_ITEMS']:
+        return jsonify({"msg": f"At most {config['BULK_MAX_ITEMS']} applications per batch"}), 400
+    
+    concurrency = data.get('concurrency', config['ANALYSIS_CONCURRENCY'])
+    if not isinstance(concurrency, int) or concurrency < 1:
+        return jsonify({"msg": "concurrency must be a positive integer"}), 400
+    concurrency = min(concurrency, config['ANALYSIS_MAX_CONCURRENCY'])
+    
+    try:
+        summary = analyze_applications(application_ids, concurrency=concurrency)
+        return jsonify(summary), 200
+    except Exception as e:
+        logger.error("Error running batch analysis", exc_info=True)
+        return jsonify({"msg": f"Error running batch analysis: {str(e)}"}), 500
@@ -1,27 +1,72 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from models import db, Job, Application, Answer
+from services.pagination import parse_page_args, keyset_page
+from services.serializers import serialize_applications, json_response
+from services.export import generate_ndjson, generate_csv
 from logger import logger
 
 applications = Blueprint('applications', __name__)
 
 @applications.route('/', methods=['GET'])
 def get_applications():
-    """Get all applications across all jobs"""
+    """Get a page of applications across all jobs, optionally filtered by job_id and status"""
     try:
-        applications = Application.query.all()
-        logger.info(f"Retrieved {len(applications)} applications across all jobs")
-        return jsonify([app.to_dict() for app in applications]), 200
+        limit, after = parse_page_args(request.args)
+    except ValueError as ve:
+        logger.warning(f"Invalid pagination parameters for applications listing: {str(ve)}")
+        return jsonify({"msg": str(ve)}), 400
+
+    try:
+        query = Application.query
+
+        job_id = request.args.get('job_id', type=int)
+        if job_id is not None:
+            query = query.filter(Application.job_id == job_id)
+
+        status = request.args.get('status')
+        if status:
+            query = query.filter(Application.status == status)
+
+        applications, next_cursor = keyset_page(query, Application, limit, after, serialize=serialize_applications)
+        logger.info(f"Retrieved {len(applications)} applications (after={after}, limit={limit})")
+
+        response = json_response(applications)
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+        return response, 200
     except Exception as e:
         logger.error("Error retrieving all applications", exc_info=True)
         return jsonify({"msg": f"Error retrieving applications: {str(e)}"}), 500
 
+@applications.route('/export', methods=['GET'])
+def export_applications():
+    """Stream all applications with their answers as NDJSON or CSV"""
+    export_format = request.args.get('format', 'ndjson')
+    job_id = request.args.get('job_id', type=int)
+
+    if export_format == 'ndjson':
+        generator, mimetype = generate_ndjson(job_id), 'application/x-ndjson'
+    elif export_format == 'csv':
+        generator, mimetype = generate_csv(job_id), 'text/csv'
+    else:
+        logger.warning(f"Export attempted with unsupported format '{export_format}'")
+        return jsonify({"msg": "Invalid format. Must be one of: ndjson, csv"}), 400
+
+    logger.info(f"Starting {export_format} export of applications (job_id={job_id})")
+    filename = f"applications{f'_job_{job_id}' if job_id is not None else ''}.{export_format}"
+    return Response(
+        stream_with_context(generator),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @applications.route('/jobs/<int:job_id>/applications', methods=['GET'])
 def get_applications_for_job(job_id):
     """Get all applications for a specific job"""
     try:
-        applications = Application.query.filter_by(job_id=job_id).all()
+        applications = serialize_applications(Application.query.filter_by(job_id=job_id).order_by(Application.id))
         logger.info(f"Retrieving applications for job {job_id}")
-        return jsonify([app.to_dict() for app in applications]), 200
+        return json_response(applications), 200
     except Exception as e:
         logger.error(f"Error retrieving applications for job {job_id}", exc_info=True)
         return jsonify({"msg": f"Error retrieving applications: {str(e)}"}), 500
@@ -89,7 +134,7 @@ def create_application():
             logger.warning(f"Application creation failed - job ID {data['job_id']} not found")
             return jsonify({"msg": "Job not found"}), 404
         
-        # Create new application
+        # Create the application and its answers in one transaction
         new_application = Application(
             job_id=data['job_id'],
             applicant_name=data['applicant_name'],
@@ -98,22 +143,17 @@ def create_application():
             ai_summary=data.get('ai_summary', '')
         )
         
-        db.session.add(new_application)
-        db.session.commit()
-        
-        # Add answers if provided
         if 'questions_answers' in data and isinstance(data['questions_answers'], list):
             for answer_data in data['questions_answers']:
                 if 'text' in answer_data and 'answer' in answer_data:
-                    answer = Answer(
-                        application_id=new_application.id,
+                    new_application.answers.append(Answer(
                         question_text=answer_data['text'],
                         answer_text=answer_data['answer'],
                         required=answer_data.get('required', True)
-                    )
-                    db.session.add(answer)
-            
-            db.session.commit()
+                    ))
+        
+        db.session.add(new_application)
+        db.session.commit()
         
         logger.info(f"Created new application {new_application.id} for job {data['job_id']} from {data['applicant_name']}")
         
@@ -123,4 +163,94 @@ def create_application():
         }), 201
     except Exception as e:
         logger.error("Error creating application", exc_info=True)
-        return jsonify({"msg": f"Error creating application: {str(e)}"}), 500 
\ No newline at end of file
+        return jsonify({"msg": f"Error creating application: {str(e)}"}), 500 
+
+def _validate_bulk_item(item, existing_job_ids):
+    """Return an error message for an invalid bulk application item, or None if it is valid"""
+    if not isinstance(item, dict):
+        return "Item must be a JSON object"
+    for field in ['job_id', 'applicant_name', 'whatsapp_number']:
+        if not item.get(field):
+            return f"Missing {field} field"
+    if item['job_id'] not in existing_job_ids:
+        return "Job not found"
+    if 'questions_answers' in item and not isinstance(item['questions_answers'], list):
+        return "questions_answers must be a list"
+    return None
+
+@applications.route('/bulk', methods=['POST'])
+def create_applications_bulk():
+    """Submit a batch of job applications in a single transaction"""
+    if not request.is_json:
+        logger.warning("Bulk application creation attempted with non-JSON request")
+        return jsonify({"msg": "Missing JSON in request"}), 400
+    
+    items = request.json.get('applications') if isinstance(request.json, dict) else None
+    if not isinstance(items, list) or not items:
+        logger.warning("Bulk application creation failed - missing applications list")
+        return jsonify({"msg": "Missing applications list"}), 400
+    
+    max_items = current_app.config.get('BULK_MAX_ITEMS', 1000)
+    if len(items) > max_items:
+        logger.warning(f"Bulk application creation failed - {len(items)} items exceeds limit of {max_items}")
+        return jsonify({"msg": f"Too many applications. Maximum is {max_items} per request"}), 400
+    
+    try:
+        # Check all referenced jobs with a single query
+        job_ids = {item.get('job_id') for item in items if isinstance(item, dict) and isinstance(item.get('job_id'), int)}
+        existing_job_ids = {job_id for (job_id,) in db.session.query(Job.id).filter(Job.id.in_(job_ids))}
+        
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            error = _validate_bulk_item(item, existing_job_ids)
+            if error:
+                results.append({"index": index, "success": False, "msg": error})
+            else:
+                results.append(None)
+                valid.append((index, item))
+        
+        if valid:
+            new_applications = [
+                Application(
+                    job_id=item['job_id'],
+                    applicant_name=item['applicant_name'],
+                    whatsapp_number=item['whatsapp_number'],
+                    resume_url=item.get('resume_url'),
+                    ai_summary=item.get('ai_summary', '')
+                )
+                for _, item in valid
+            ]
+            db.session.add_all(new_applications)
+            db.session.flush()  # To get the application IDs
+            
+            answer_rows = [
+                {
+                    'application_id': application.id,
+                    'question_text': answer_data['text'],
+                    'answer_text': answer_data['answer'],
+                    'required': answer_data.get('required', True)
+                }
+                for (_, item), application in zip(valid, new_applications)
+                for answer_data in item.get('questions_answers') or []
+                if isinstance(answer_data, dict) and 'text' in answer_data and 'answer' in answer_data
+            ]
+            if answer_rows:
+                db.session.execute(Answer.__table__.insert(), answer_rows)
+            
+            db.session.commit()
+            
+            for (index, _), application in zip(valid, new_applications):
+                results[index] = {"index": index, "success": True, "application_id": application.id}
+        
+        logger.info(f"Bulk created {len(valid)} of {len(items)} applications")
+        return jsonify({
+            "msg": f"Created {len(valid)} of {len(items)} applications",
+            "created": len(valid),
+            "failed": len(items) - len(valid),
+            "results": results
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error bulk creating applications", exc_info=True)
+        return jsonify({"msg": f"Error creating applications: {str(e)}"}), 500
@@ -0,0 +1,85 @@
+import json
+import time
+import hashlib
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.ai_service import stream_HR_agent
+from services.metrics import increment
+from logger import logger
+
+chat = Blueprint('chat', __name__)
+
+MAX_MESSAGE_LENGTH = 4000
+MAX_SESSION_ID_LENGTH = 100
+
+
+def web_conversation_id(session_id: str) -> str:
+    """
+    Conversation id for a web chat session.
+
+    Conversations are keyed by a String(20) phone number column, so the session id is
+    hashed into "web:" plus 15 hex characters, which also keeps web conversations apart
+    from WhatsApp numbers.
+    """
+    return "web:" + hashlib.sha256(session_id.encode()).hexdigest()[:15]
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@chat.route('/stream', methods=['POST'])
+def chat_stream():
+    """
+    Talk to the HR agent from the web widget, streaming the reply as Server-Sent Events.
+
+    Body: {"session_id": "...", "message": "...", "job_id": optional}
+
+    Events: one or more `token` events with {"text": chunk}, then `done` with the full
+    {"text": reply}, or `error` with {"msg": ...} if the reply broke off midway.
+    """
+    if not request.is_json:
+        logger.warning("Chat stream attempted with non-JSON request")
+        return jsonify({"msg": "Missing JSON in request"}), 400
+
+    data = request.json
+    session_id = data.get('session_id')
+    message = data.get('message')
+    job_id = data.get('job_id')
+
+    if not isinstance(session_id, str) or not session_id.strip() or len(session_id) > MAX_SESSION_ID_LENGTH:
+        return jsonify({"msg": f"session_id must be a non-empty string of at most {MAX_SESSION_ID_LENGTH} characters"}), 400
+    if not isinstance(message, str) or not message.strip() or len(message) > MAX_MESSAGE_LENGTH:
+        return jsonify({"msg": f"message must be a non-empty string of at most {MAX_MESSAGE_LENGTH} characters"}), 400
+    if job_id is not None and not isinstance(job_id, int):
+        return jsonify({"msg": "job_id must be an integer"}), 400
+
+    conversation_id = web_conversation_id(session_id.strip())
+    logger.info(f"Streaming chat reply for {conversation_id}")
+    increment('chat_stream_requests')
+
+    def generate():
+        start = time.perf_counter()
+        first_chunk = True
+        chunks = []
+        try:
+            for chunk in stream_HR_agent(conversation_id, message.strip(), job_id=job_id):
+                if first_chunk:
+                    increment('chat_stream_first_chunk_ms', (time.perf_counter() - start) * 1000)
+                    first_chunk = False
+                chunks.append(chunk)
+                yield sse_event('token', {'text': chunk})
+            yield sse_event('done', {'text': "".join(chunks)})
+        except Exception:
+            logger.error(f"Chat stream for {conversation_id} broke off", exc_info=True)
+            yield sse_event('error', {'msg': "The reply was interrupted, please try again."})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the stream
+            'X-Accel-Buffering': 'no',
+        }
+    )
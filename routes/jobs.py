@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models import db, Job, Question
+from services.pagination import parse_page_args, keyset_page
+from services.serializers import serialize_jobs, dumps
+from services.catalog import bump_catalog_version, get_cached_payload, conditional_json_response
 from logger import logger
 
 jobs = Blueprint('jobs', __name__)
@@ -7,19 +10,39 @@ jobs = Blueprint('jobs', __name__)
 @jobs.route('/', methods=['GET'])
 def get_jobs():
     try:
-        jobs = Job.query.all()
-        logger.info(f"Retrieved {len(jobs)} jobs")
-        return jsonify([job.to_dict() for job in jobs]), 200
+        limit, after = parse_page_args(request.args)
+    except ValueError as ve:
+        logger.warning(f"Invalid pagination parameters for jobs listing: {str(ve)}")
+        return jsonify({"msg": str(ve)}), 400
+
+    def build():
+        jobs, next_cursor = keyset_page(Job.query, Job, limit, after, serialize=serialize_jobs)
+        logger.info(f"Retrieved {len(jobs)} jobs (after={after}, limit={limit})")
+        headers = {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+        return dumps(jobs), headers
+
+    try:
+        body, etag, headers = get_cached_payload(('jobs', limit, after), build)
+        return conditional_json_response(body, etag, headers)
     except Exception as e:
         logger.error("Error retrieving jobs", exc_info=True)
         return jsonify({"msg": "Error retrieving jobs"}), 500
 
 @jobs.route('/<int:job_id>', methods=['GET'])
 def get_job(job_id):
-    try:
-        job = Job.query.get_or_404(job_id)
+    def build():
+        jobs = serialize_jobs(Job.query.filter_by(id=job_id))
+        if not jobs:
+            return None
         logger.info(f"Retrieved job details for job ID: {job_id}")
-        return jsonify(job.to_dict()), 200
+        return dumps(jobs[0]), {}
+
+    try:
+        payload = get_cached_payload(('job', job_id), build)
+        if payload is None:
+            logger.warning(f"Job not found with ID: {job_id}")
+            return jsonify({"msg": "Job not found"}), 404
+        return conditional_json_response(*payload)
     except Exception as e:
         logger.error(f"Error retrieving job with ID {job_id}", exc_info=True)
         return jsonify({"msg": f"Error retrieving job: {str(e)}"}), 500
@@ -66,6 +89,7 @@ def create_job():
                     questions_added += 1
             
         db.session.commit()
+        bump_catalog_version()
         logger.info(f"Job created successfully with ID: {new_job.id}, added {questions_added} questions")
         return jsonify(new_job.to_dict()), 201
     
@@ -118,6 +142,7 @@ def update_job(job_id):
             logger.info(f"Added {questions_updated} new questions for job ID: {job_id}")
         
         db.session.commit()
+        bump_catalog_version()
         logger.info(f"Job updated successfully with ID: {job_id}")
         return jsonify(job.to_dict()), 200
     
@@ -131,6 +156,7 @@ def delete_job(job_id):
         job = Job.query.get_or_404(job_id)
         db.session.delete(job)
         db.session.commit()
+        bump_catalog_version()
         logger.info(f"Job deleted successfully with ID: {job_id}")
         return jsonify({"msg": "Job deleted successfully"}), 200
     except Exception as e:
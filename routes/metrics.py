@@ -0,0 +1,41 @@
+from flask import Blueprint, jsonify
+from services.metrics import snapshot
+from services.routing import ROUTES
+from logger import logger
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.route('/', methods=['GET'])
+def get_metrics():
+    """Return the process-wide counters and gauges"""
+    try:
+        data = snapshot()
+        counters = data['counters']
+
+        # Each coalesced WhatsApp message is one agent turn (LLM call) that did not happen
+        received = counters.get('whatsapp_messages_received', 0)
+        coalesced = counters.get('whatsapp_messages_coalesced', 0)
+        dedup_checks = counters.get('whatsapp_dedup_checks', 0)
+        dedup_hits = counters.get('whatsapp_dedup_hits', 0)
+        turns = counters.get('hr_agent_measured_turns', 0)
+        tool_calls = counters.get('hr_agent_tool_calls', 0)
+        data['derived'] = {
+            'llm_calls_saved': coalesced,
+            'coalesce_ratio': coalesced / received if received else 0.0,
+            'dedup_hit_rate': dedup_hits / dedup_checks if dedup_checks else 0.0,
+            'tool_calls_per_turn': tool_calls / turns if turns else 0.0,
+            'db_queries_per_turn': counters.get('hr_agent_db_queries', 0) / turns if turns else 0.0,
+            'chat_stream_first_chunk_ms_avg': counters.get('chat_stream_first_chunk_ms', 0) / counters['chat_stream_requests'] if counters.get('chat_stream_requests') else 0.0,
+            'tool_cache_hit_rate': counters.get('hr_agent_tool_cache_hits', 0) / tool_calls if tool_calls else 0.0,
+        }
+
+        # Share of HR agent turns answered on each model route, and their average latency
+        routed = sum(counters.get(f'hr_agent_route_{route}_turns', 0) for route in ROUTES)
+        for route in ROUTES:
+            route_turns = counters.get(f'hr_agent_route_{route}_turns', 0)
+            data['derived'][f'route_{route}_share'] = route_turns / routed if routed else 0.0
+            data['derived'][f'route_{route}_latency_ms_avg'] = counters.get(f'hr_agent_route_{route}_ms', 0) / route_turns if route_turns else 0.0
+        return jsonify(data), 200
+    except Exception as e:
+        logger.error("Error retrieving metrics", exc_info=True)
+        return jsonify({"msg": f"Error retrieving metrics: {str(e)}"}), 500
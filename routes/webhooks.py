@@ -1,62 +1,147 @@
-from flask import Blueprint, request, jsonify
-from services.whatsapp import send_whatsapp_message
+from flask import Blueprint, request, jsonify, current_app
+from services.whatsapp import send_whatsapp_message, get_graph_client, WhatsAppSendError
 from services.ai_service import talk_to_HR_agent
+from services.metrics import increment
+from services.catalog import bump_catalog_version
 from logger import logger
 from typing import Optional
 from models import Job, Question, db
 
 webhooks = Blueprint('webhooks', __name__)
 
+def parse_whatsapp_message(message: dict) -> dict:
+    """Extract the sender, text and media of a WhatsApp message into a work queue payload"""
+    phone_number = message['from']
+    
+    # Extract message content based on type
+    message_type = message.get('type', 'text')
+    message_text = ''
+    media_url = None
+    mime_type = None
+    
+    if message_type == 'text':
+        message_text = message['text']['body'].strip()
+    elif message_type == 'image':
+        media_url = message['image'].get('url', '')
+        mime_type = 'image/jpeg'  # Default mime type for WhatsApp images
+        message_text = message.get('caption', 'Image')
+    elif message_type == 'video':
+        media_url = message['video'].get('url', '')
+        mime_type = 'video/mp4'  # Default mime type for WhatsApp videos
+        message_text = message.get('caption', 'Video')
+    elif message_type == 'audio':
+        media_url = message['audio'].get('url', '')
+        mime_type = 'audio/ogg'  # Default mime type for WhatsApp audio
+        message_text = 'Audio message'
+    elif message_type == 'document':
+        media_url = message['document'].get('url', '')
+        mime_type = message['document'].get('mime_type', 'application/octet-stream')
+        message_text = message.get('caption', 'Document')
+    
+    return {
+        'phone_number': phone_number,
+        'text': message_text,
+        'media_url': media_url,
+        'mime_type': mime_type
+    }
+
+def merge_whatsapp_messages(queued: dict, new: dict) -> Optional[dict]:
+    """
+    Combine a burst of messages from one sender into a single agent turn.
+
+    Returns None when both messages carry media, since a turn holds at most one attachment.
+    """
+    if queued.get('media_url') and new.get('media_url'):
+        return None
+    
+    merged = dict(queued)
+    merged['text'] = f"{queued['text']}\n{new['text']}"
+    if new.get('media_url'):
+        merged['media_url'] = new['media_url']
+        merged['mime_type'] = new['mime_type']
+    merged['message_count'] = queued.get('message_count', 1) + 1
+    return merged
+
+def process_whatsapp_message(payload: dict):
+    """
+    Run the HR agent on a queued WhatsApp message and send the reply (runs on a queue worker).
+    
+    Raises WhatsAppSendError when the reply could not be sent, so the queue retries the
+    item with backoff. The reply is kept in the payload, so a retry only resends it
+    instead of running the agent (and saving the turn) again.
+    """
+    phone_number = payload['phone_number']
+    
+    response = payload.get('reply')
+    if response is None:
+        increment('hr_agent_turns')
+        
+        # Process with the HR agent
+        response = talk_to_HR_agent(
+            phone_number=phone_number,
+            text=payload['text'],
+            media_url=payload.get('media_url'),
+            mime_type=payload.get('mime_type')
+        )
+        payload['reply'] = response
+    
+    # Send the response back to WhatsApp
+    if not send_whatsapp_message(phone_number, response):
+        if not get_graph_client().configured:
+            # Nothing to retry against; send_whatsapp_message already logged the reply
+            return
+        raise WhatsAppSendError(f"Could not send the reply to {phone_number}")
+    logger.info(f"Sent response to {phone_number}")
+
 @webhooks.route('/whatsapp', methods=['POST'])
 def whatsapp_webhook():
-    """Handle incoming WhatsApp messages using the HR agent"""
+    """Queue incoming WhatsApp messages for the HR agent and acknowledge immediately"""
     try:
         # Parse incoming WhatsApp data
         data = request.json
         data = data['entry'][0]['changes'][0]['value']
-        if 'messages' in data:
-            message = data['messages'][0]
-            phone_number = message['from']
-
-            # Extract message content based on type
-            message_type = message.get('type', 'text')
-            message_text = ''
-            media_url = None
-            mime_type = None
-            
-        if message_type == 'text':
-            message_text = message['text']['body'].strip()
-        elif message_type == 'image':
-            media_url = message['image'].get('url', '')
-            mime_type = 'image/jpeg'  # Default mime type for WhatsApp images
-            message_text = message.get('caption', 'Image')
-        elif message_type == 'video':
-            media_url = message['video'].get('url', '')
-            mime_type = 'video/mp4'  # Default mime type for WhatsApp videos
-            message_text = message.get('caption', 'Video')
-        elif message_type == 'audio':
-            media_url = message['audio'].get('url', '')
-            mime_type = 'audio/ogg'  # Default mime type for WhatsApp audio
-            message_text = 'Audio message'
-        elif message_type == 'document':
-            media_url = message['document'].get('url', '')
-            mime_type = message['document'].get('mime_type', 'application/octet-stream')
-            message_text = message.get('caption', 'Document')
+        if 'messages' not in data:
+            # Delivery/read status updates carry no message to answer
+            return "", 200
         
-        # Log the incoming message
-        logger.info(f"Message from {phone_number}: {message_text} | Media: {media_url} | Type: {mime_type}")
+        # Meta redelivers events it thinks we missed; drop those before doing any work
+        message = data['messages'][0]
+        message_id = message.get('id')
+        dedup = current_app.extensions['message_dedup']
+        if message_id and dedup.seen(message_id):
+            logger.info(f"Ignoring redelivered WhatsApp message {message_id}")
+            return "", 200
         
-        # Process with the HR agent
-        response = talk_to_HR_agent(
-            phone_number=phone_number,
-            text=message_text,
-            media_url=media_url,
-            mime_type=mime_type
-        )
+        payload = parse_whatsapp_message(message)
         
-        # Send the response back to WhatsApp
-        send_whatsapp_message(phone_number, response)
-        logger.info(f"Sent response to {phone_number}")
+        # Log the incoming message
+        logger.info(f"Message from {payload['phone_number']}: {payload['text']} | Media: {payload['media_url']} | Type: {payload['mime_type']}")
+        
+        # Persist the message; a queue worker runs the agent and sends the reply.
+        # Messages from one number share a lane, so they are answered in order, and
+        # a burst arriving within the debounce window is merged into one agent turn.
+        increment('whatsapp_messages_received')
+        try:
+            item_id, merged = current_app.extensions['work_queue'].enqueue(
+                payload,
+                lane=payload['phone_number'],
+                delay=current_app.config['WHATSAPP_DEBOUNCE_SECONDS'],
+                max_delay=current_app.config['WHATSAPP_DEBOUNCE_MAX_SECONDS'],
+                merge=merge_whatsapp_messages
+            )
+        except Exception:
+            # Let a redelivery of this message through, since it was never queued,
+            # and ask Meta for one with a 5xx
+            logger.error(f"Could not queue message from {payload['phone_number']}", exc_info=True)
+            if message_id:
+                dedup.forget(message_id)
+            increment('whatsapp_enqueue_failures')
+            return "", 503
+        if merged:
+            increment('whatsapp_messages_coalesced')
+            logger.info(f"Merged message from {payload['phone_number']} into queued work item {item_id}")
+        else:
+            logger.info(f"Queued message from {payload['phone_number']} as work item {item_id}")
         
         return "", 200
         
@@ -65,7 +150,7 @@ def whatsapp_webhook():
         return "", 200  # Always return 200 to WhatsApp to avoid retries
     except Exception as e:
         logger.error(f"Error processing WhatsApp webhook", exc_info=True)
-        return "", 200  # Always return 200 to WhatsApp to avoid retries
+        return "", 200  # Don't retry events we can't handle; queueing failures return 503 above
 
 @webhooks.route('/whatsapp/verify', methods=['GET'])
 def verify_webhook():
@@ -137,6 +222,7 @@ def create_job():
                 questions_added += 1
         
         db.session.commit()
+        bump_catalog_version()
         logger.info(f"Created job ID {new_job.id} with {questions_added} questions")
         
         return jsonify({
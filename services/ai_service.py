@@ -1,7 +1,8 @@
-import os
 import json
+import time
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from flask import current_app
 from logger import logger
 
 # Load environment variables
@@ -12,17 +13,218 @@ from services.tools import (
     get_job_details,
     get_available_jobs,
     get_job_questions,
+    search_jobs,
     submit_application,
+    tool_call_scope,
 )
+from services.metrics import increment
+from services.resilience import deadline_scope, current_deadline, get_circuit_breaker, CircuitOpenError, DeadlineExceeded
+from services.catalog import get_catalog_prompt
+from services.conversation import get_conversation_context, save_turn, schedule_compaction
+from services.routing import classify_turn, record_route, LIGHT, FULL, ESCALATED
 
-# Try to initialize Gemini client if package is available
-from google import genai
 from google.genai import types
+from services.llm import create_llm_backend
 
-# Initialize Gemini client with API key if available
+# Initialize the LLM backend (Gemini unless LLM_BACKEND selects another one)
+llm = create_llm_backend()
+logger.info(f"Successfully initialized {llm.name} LLM backend")
 
-client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-logger.info("Successfully initialized Gemini client")
+
+NOT_CONFIGURED_RESPONSE = "Thank you for your message. Our HR team will review your application soon."
+DEFAULT_ERROR_RESPONSE = "I apologize, but I'm experiencing some technical difficulties. Our HR team will follow up with you shortly."
+
+
+BASE_SYSTEM_PROMPT = """
+        You are an AI HR Assistant for a company. Your primary role is to help candidates apply for jobs
+        and answer their questions about available positions.
+        
+        You can help users with:
+        1. Finding available job listings
+        2. Providing details about specific jobs
+        3. Getting screening questions for a position
+        4. Submitting their job application
+        
+        Be professional, friendly, and conversational. Focus on understanding the candidate's
+        needs and helping them find the right position.
+        
+        This conversation is happening over WhatsApp. Format your responses appropriately:
+        - Use *bold* for emphasis
+        - Use _italics_ for highlighting key points
+        - Break long text into shorter paragraphs
+        - Use numbered lists (1. Item) or bullet points (- Item) for clarity
+        """
+
+COMPACT_CATALOG_INSTRUCTIONS = """
+        The job list below only has each job's id, title and department. Before describing a job,
+        call get_job_details with its id to read the description and requirements, and call
+        get_job_questions before screening a candidate. Use search_jobs to find jobs matching
+        what the candidate is looking for.
+        """
+
+# The light route answers without the catalog or tools and hands anything else back
+ESCALATE_MARKER = "ESCALATE"
+LIGHT_INSTRUCTIONS = f"""
+        In this reply you have no job information and no tools. Answer greetings, thanks and
+        small talk briefly. If answering needs anything about jobs, screening questions or an
+        application, reply with only the word {ESCALATE_MARKER}.
+        """
+
+HR_AGENT_TOOLS = [
+    get_job_details,
+    get_available_jobs,
+    get_job_questions,
+    search_jobs,
+    submit_application,
+]
+
+
+def build_system_prompt(job_id: Optional[int] = None, media_url: Optional[str] = None, mime_type: Optional[str] = None, catalog_mode: Optional[str] = None) -> str:
+    """
+    Build the HR agent's system prompt for one turn.
+    
+    Args:
+        job_id: Optional ID of a specific job to focus on
+        media_url: Optional URL to any media the user sent
+        mime_type: Optional MIME type of the media
+        catalog_mode: 'full' inlines every job with its details and questions, 'compact'
+            only inlines id, title and department and lets the model fetch details with tools,
+            'none' leaves the catalog out. Defaults to the HR_AGENT_CATALOG_MODE setting.
+        
+    Returns:
+        str: The system prompt
+    """
+    system_prompt = BASE_SYSTEM_PROMPT
+    
+    # If a job ID is provided, add specific instructions for that job
+    if job_id:
+        try:
+            from models import Job
+            job = Job.query.get(job_id)
+            if job and job.aiInstructions:
+                system_prompt += f"\n\nSpecial instructions for {job.jobTitle} role: {job.aiInstructions}"
+                logger.info(f"Added job-specific instructions for job_id: {job_id}")
+        except Exception as e:
+            logger.error(f"Error getting job details for job_id {job_id}", exc_info=True)
+    
+    catalog_mode = catalog_mode or current_app.config.get('HR_AGENT_CATALOG_MODE', 'full')
+    if catalog_mode == 'compact':
+        system_prompt += COMPACT_CATALOG_INSTRUCTIONS
+        system_prompt += f"\n\nthese are the available jobs right now: {get_catalog_prompt(compact=True)}"
+    elif catalog_mode != 'none':
+        system_prompt += f"\n\nthese are the available jobs right now: {get_catalog_prompt()}"
+
+    # Handle media if provided
+    media_context = ""
+    if media_url and mime_type:
+        logger.info(f"Media detected: {mime_type}")
+        if "image" in mime_type:
+            media_context = f"The user has shared an image with you. "
+        elif "video" in mime_type:
+            media_context = f"The user has shared a video with you. "
+        elif "audio" in mime_type:
+            media_context = f"The user has shared an audio message with you. "
+        elif "application/pdf" in mime_type:
+            media_context = f"The user has shared a PDF document with you. "
+            
+        if media_context:
+            system_prompt += f"\n\n{media_context}You can acknowledge this, but you cannot view its contents directly."
+    
+    return system_prompt
+
+
+def summarize_conversation(previous_summary: Optional[str], turns: List[tuple]) -> str:
+    """
+    Fold older conversation turns into the running summary of a candidate's conversation.
+    
+    Args:
+        previous_summary: The summary so far, if any
+        turns: List of (role, text) tuples, oldest first
+        
+    Returns:
+        str: The updated summary
+    """
+    transcript = "\n".join(f"{'Candidate' if role == 'user' else 'HR Assistant'}: {text}" for role, text in turns)
+    prompt = (
+        "Update the summary of a WhatsApp conversation between a job candidate and an HR assistant. "
+        "Keep the candidate's name, the jobs discussed, answers already given to screening questions, "
+        "whether an application was submitted, and any open questions. Use at most 200 words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+    response = get_circuit_breaker('gemini').call(
+        lambda: llm.generate_content(
+            model=current_app.config['HR_AGENT_MODEL'],
+            config=types.GenerateContentConfig(temperature=0.2),
+            contents=prompt
+        ),
+        timeout=current_app.config['HR_AGENT_TURN_BUDGET_SECONDS']
+    )
+    return response.text or previous_summary or ""
+
+
+ANALYSIS_PROMPT = """
+        You are screening a job applicant. Compare the applicant's WhatsApp conversation with the
+        HR assistant against the job requirements and reply with a JSON object with these keys:
+        - "analysis": a short assessment of how well the applicant fits the role
+        - "key_strengths": the applicant's main strengths for the role, as one string
+        - "match_score": how well the applicant matches the requirements, from 0 to 100
+        - "skills": a list of the skills the applicant mentioned, each a short name like "Python"
+        """
+
+
+def analyze_with_ai(application, job_requirements: str, conversation_text: str) -> Dict[str, Any]:
+    """
+    Score an application against its job's requirements from the applicant's conversation.
+    
+    Args:
+        application: The Application being analyzed
+        job_requirements: The requirements of the job applied for
+        conversation_text: The conversation with the applicant, one "Speaker: message" per line
+        
+    Returns:
+        dict: analysis (str), key_strengths (str), match_score (float, 0-100) and skills (list of str)
+        
+    Raises:
+        ValueError: If the model's reply is not a valid analysis
+    """
+    prompt = (
+        f"{ANALYSIS_PROMPT}\n\n"
+        f"Applicant: {application.applicant_name}\n\n"
+        f"Job requirements:\n{job_requirements}\n\n"
+        f"Conversation:\n{conversation_text or '(no messages)'}"
+    )
+    response = get_circuit_breaker('gemini_analysis').call(
+        lambda: llm.generate_content(
+            model=current_app.config['HR_AGENT_MODEL'],
+            config=types.GenerateContentConfig(temperature=0.2, response_mime_type='application/json'),
+            contents=prompt
+        ),
+        timeout=current_app.config['HR_AGENT_TURN_BUDGET_SECONDS']
+    )
+
+    try:
+        result = json.loads(response.text or "")
+        key_strengths = result.get('key_strengths') or ""
+        if isinstance(key_strengths, list):
+            key_strengths = "\n".join(str(strength) for strength in key_strengths)
+        return {
+            'analysis': str(result['analysis']),
+            'key_strengths': str(key_strengths),
+            'match_score': min(max(float(result['match_score']), 0.0), 100.0),
+            'skills': [str(skill) for skill in result.get('skills') or [] if str(skill).strip()],
+        }
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError(f"Invalid analysis from the model: {e}") from e
+
+
+def _record_turn_stats(phone_number: str, turn_stats):
+    increment('hr_agent_measured_turns')
+    increment('hr_agent_tool_calls', turn_stats.tool_calls)
+    increment('hr_agent_tool_cache_hits', turn_stats.cache_hits)
+    increment('hr_agent_db_queries', turn_stats.db_queries)
+    logger.info(f"Turn for {phone_number} made {turn_stats.tool_calls} tool calls "
+                f"({turn_stats.cache_hits} memoized) and {turn_stats.db_queries} DB queries")
 
 
 def talk_to_HR_agent(phone_number: str, text: str, media_url: Optional[str] = None, mime_type: Optional[str] = None, job_id: Optional[int] = None):
@@ -39,102 +241,228 @@ def talk_to_HR_agent(phone_number: str, text: str, media_url: Optional[str] = No
     Returns:
         str: The AI-generated response
     """
-    # If Gemini API key is not configured, return a default response
-    if not os.getenv('GEMINI_API_KEY'):
+    # If the LLM backend is not configured (no Gemini API key), return a default response
+    if not llm.configured:
         logger.warning("Gemini API key not configured")
-        return "Thank you for your message. Our HR team will review your application soon."
+        return NOT_CONFIGURED_RESPONSE
     
     try:
-        logger.info(f"Processing message from {phone_number}")
-        
-        # Create a system prompt for Gemini
-        system_prompt = """
-        You are an AI HR Assistant for a company. Your primary role is to help candidates apply for jobs
-        and answer their questions about available positions.
+        with deadline_scope(current_app.config['HR_AGENT_TURN_BUDGET_SECONDS']), tool_call_scope() as turn_stats:
+            try:
+                return _run_HR_agent_turn(phone_number, text, media_url, mime_type, job_id)
+            finally:
+                _record_turn_stats(phone_number, turn_stats)
         
-        You can help users with:
-        1. Finding available job listings
-        2. Providing details about specific jobs
-        3. Getting screening questions for a position
-        4. Submitting their job application
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        logger.warning(f"Returning fallback response to {phone_number}: {str(e)}")
+        return DEFAULT_ERROR_RESPONSE
+    except Exception as e:
+        error_msg = f"Error processing message: {str(e)}"
+        logger.error(error_msg, exc_info=True)
         
-        Be professional, friendly, and conversational. Focus on understanding the candidate's
-        needs and helping them find the right position.
+        # Return a default error response
+        return DEFAULT_ERROR_RESPONSE
+
+
+def stream_HR_agent(conversation_id: str, text: str, job_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Streaming variant of talk_to_HR_agent: yields the reply in chunks as the model produces them.
+    
+    Tool calls happen before the first chunk, exactly as in talk_to_HR_agent, and the
+    full reply is saved to the conversation once the stream completes.
+    
+    Args:
+        conversation_id: Identifies the conversation (a phone number, or a web chat session)
+        text: The text message from the user
+        job_id: Optional ID of a specific job to focus on
         
-        This conversation is happening over WhatsApp. Format your responses appropriately:
-        - Use *bold* for emphasis
-        - Use _italics_ for highlighting key points
-        - Break long text into shorter paragraphs
-        - Use numbered lists (1. Item) or bullet points (- Item) for clarity
-        """
+    Yields:
+        str: Pieces of the reply, or the fallback text if the turn fails before any output
         
-        # If a job ID is provided, add specific instructions for that job
-        if job_id:
+    Raises:
+        Exception: If the turn fails after part of the reply was already yielded
+    """
+    if not llm.configured:
+        logger.warning("Gemini API key not configured")
+        yield NOT_CONFIGURED_RESPONSE
+        return
+    
+    chunks = []
+    try:
+        with deadline_scope(current_app.config['HR_AGENT_TURN_BUDGET_SECONDS']) as deadline, tool_call_scope() as turn_stats:
             try:
-                from models import Job
-                job = Job.query.get(job_id)
-                if job and job.aiInstructions:
-                    system_prompt += f"\n\nSpecial instructions for {job.jobTitle} role: {job.aiInstructions}"
-                    logger.info(f"Added job-specific instructions for job_id: {job_id}")
-            except Exception as e:
-                logger.error(f"Error getting job details for job_id {job_id}", exc_info=True)
-        
-        system_prompt += f"\n\nthese are the available jobs right now: {get_available_jobs()}"
-
-        # Handle media if provided
-        media_context = ""
-        if media_url and mime_type:
-            logger.info(f"Media detected: {mime_type}")
-            if "image" in mime_type:
-                media_context = f"The user has shared an image with you. "
-            elif "video" in mime_type:
-                media_context = f"The user has shared a video with you. "
-            elif "audio" in mime_type:
-                media_context = f"The user has shared an audio message with you. "
-            elif "application/pdf" in mime_type:
-                media_context = f"The user has shared a PDF document with you. "
-                
-            if media_context:
-                system_prompt += f"\n\n{media_context}You can acknowledge this, but you cannot view its contents directly."
+                system_prompt, contents, needs_compaction = _prepare_HR_agent_turn(conversation_id, text, None, None, job_id)
                 
-        # Format conversation for Gemini
-        contents = [{"role": "user", "parts": [{"text": text}]}]
+                logger.info("Streaming from Gemini API with automatic function calling")
+                stream = get_circuit_breaker('gemini').stream(
+                    lambda: llm.generate_content_stream(
+                        model=current_app.config['HR_AGENT_MODEL'],
+                        config=_HR_agent_config(system_prompt, deadline.remaining()),
+                        contents=contents
+                    ),
+                    deadline=deadline
+                )
+                for chunk in stream:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+            finally:
+                _record_turn_stats(conversation_id, turn_stats)
         
-        logger.info("Calling Gemini API with automatic function calling")
-        # Call the Gemini API with automatic function calling
-        try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
+        final_response = "".join(chunks)
+        logger.info(f"Streamed {len(chunks)} chunks from Gemini API")
+        if final_response:
+            save_turn(conversation_id, text, final_response)
+            if needs_compaction:
+                schedule_compaction(conversation_id, summarize_conversation)
+    
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        logger.warning(f"Streaming fallback response to {conversation_id}: {str(e)}")
+        if chunks:
+            raise
+        yield DEFAULT_ERROR_RESPONSE
+    except Exception as e:
+        logger.error(f"Error streaming message: {str(e)}", exc_info=True)
+        if chunks:
+            raise
+        yield DEFAULT_ERROR_RESPONSE
+
+
+def _HR_agent_config(system_prompt: str, remaining: float) -> types.GenerateContentConfig:
+    """Model config for an HR agent turn with `remaining` seconds of budget left"""
+    return types.GenerateContentConfig(
+        tools=HR_AGENT_TOOLS,
+        automatic_function_calling=types.AutomaticFunctionCallingConfig(
+            disable=False
+        ),
+        temperature=0.7,
+        system_instruction=system_prompt,
+        # Bounds each request of the function calling loop
+        http_options=types.HttpOptions(timeout=max(int(remaining * 1000), 1)),
+    )
+
+
+def _load_HR_agent_context(phone_number: str, text: str) -> Tuple[List[dict], Optional[str], bool]:
+    """Load the recent conversation plus the new message, and the running summary, for one turn"""
+    logger.info(f"Processing message from {phone_number}")
+    
+    # Load the recent conversation within the history token budget
+    history, summary, needs_compaction = [], None, False
+    try:
+        history, summary, needs_compaction = get_conversation_context(phone_number)
+    except Exception:
+        logger.error(f"Error loading conversation history for {phone_number}", exc_info=True)
+            
+    # Format conversation for Gemini
+    contents = history + [{"role": "user", "parts": [{"text": text}]}]
+    return contents, summary, needs_compaction
+
+
+def _HR_agent_system_prompt(job_id: Optional[int], media_url: Optional[str], mime_type: Optional[str], summary: Optional[str], catalog_mode: Optional[str] = None) -> str:
+    """Create a system prompt for Gemini, with the conversation summary if there is one"""
+    system_prompt = build_system_prompt(job_id=job_id, media_url=media_url, mime_type=mime_type, catalog_mode=catalog_mode)
+    if summary:
+        system_prompt += f"\n\nSummary of your earlier conversation with this candidate: {summary}"
+    return system_prompt
+
+
+def _prepare_HR_agent_turn(phone_number: str, text: str, media_url: Optional[str], mime_type: Optional[str], job_id: Optional[int]) -> Tuple[str, List[dict], bool]:
+    """Build the system prompt and the contents (history plus the new message) for one turn"""
+    contents, summary, needs_compaction = _load_HR_agent_context(phone_number, text)
+    system_prompt = _HR_agent_system_prompt(job_id, media_url, mime_type, summary)
+    return system_prompt, contents, needs_compaction
+
+
+def _run_light_turn(job_id: Optional[int], summary: Optional[str], contents: List[dict]) -> Optional[str]:
+    """
+    Answer a small-talk turn with the light model: no catalog, no tools, a short timeout.
+    
+    Returns:
+        str: The reply, or None if the full model should take the turn (the light model
+            failed, timed out, gave no answer or asked to escalate)
+    """
+    app_config = current_app.config
+    system_prompt = _HR_agent_system_prompt(job_id, None, None, summary, catalog_mode='none') + LIGHT_INSTRUCTIONS
+    # Leave the rest of the turn's budget for the full model in case this one fails
+    timeout = min(current_deadline().remaining(), app_config['HR_AGENT_LIGHT_TIMEOUT_SECONDS'])
+    try:
+        response = get_circuit_breaker('gemini_light').call(
+            lambda: llm.generate_content(
+                model=app_config['HR_AGENT_LIGHT_MODEL'],
                 config=types.GenerateContentConfig(
-                    tools=[
-                        get_job_details,
-                        get_available_jobs,
-                        get_job_questions,
-                        submit_application,
-                    ],
-                    automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                        disable=False
-                    ),
                     temperature=0.7,
+                    max_output_tokens=256,
                     system_instruction=system_prompt,
+                    http_options=types.HttpOptions(timeout=max(int(timeout * 1000), 1)),
                 ),
                 contents=contents
-            )
-            
-            # Extract the final response
-            final_response = response.text
-            logger.info("Received response from Gemini API")
-            
-        except Exception as api_error:
-            logger.error("Error calling Gemini API", exc_info=True)
-            raise api_error
-                
-        return final_response
-        
+            ),
+            timeout=timeout
+        )
     except Exception as e:
-        error_msg = f"Error processing message: {str(e)}"
-        logger.error(error_msg, exc_info=True)
+        logger.warning(f"Light model failed, escalating to the full model: {str(e)}")
+        increment('hr_agent_route_light_failures')
+        return None
+    
+    reply = (response.text or "").strip()
+    if not reply or ESCALATE_MARKER in reply:
+        logger.info("Light model handed the turn to the full model")
+        return None
+    return reply
+
+
+def _run_full_turn(job_id: Optional[int], media_url: Optional[str], mime_type: Optional[str], summary: Optional[str], contents: List[dict]) -> str:
+    """Answer a turn with the full model, the job catalog and the tools"""
+    system_prompt = _HR_agent_system_prompt(job_id, media_url, mime_type, summary)
+    
+    logger.info("Calling Gemini API with automatic function calling")
+    # Call the Gemini API with automatic function calling, within what is left of the turn's budget.
+    # The HTTP timeout bounds each request of the function calling loop; the breaker bounds the whole call.
+    remaining = current_deadline().remaining()
+    try:
+        response = get_circuit_breaker('gemini').call(
+            lambda: llm.generate_content(
+                model=current_app.config['HR_AGENT_MODEL'],
+                config=_HR_agent_config(system_prompt, remaining),
+                contents=contents
+            ),
+            timeout=remaining
+        )
         
-        # Return a default error response
-        default_error_response = "I apologize, but I'm experiencing some technical difficulties. Our HR team will follow up with you shortly."
-        return default_error_response 
\ No newline at end of file
+        # Extract the final response
+        final_response = response.text
+        logger.info("Received response from Gemini API")
+        
+    except (CircuitOpenError, DeadlineExceeded):
+        raise
+    except Exception as api_error:
+        logger.error("Error calling Gemini API", exc_info=True)
+        raise api_error
+    return final_response
+
+
+def _run_HR_agent_turn(phone_number: str, text: str, media_url: Optional[str], mime_type: Optional[str], job_id: Optional[int]) -> str:
+    """Load the history for one turn, answer it on the route it needs and save the exchange"""
+    contents, summary, needs_compaction = _load_HR_agent_context(phone_number, text)
+    
+    start = time.perf_counter()
+    route, reason = FULL, "routing_disabled"
+    if current_app.config['HR_AGENT_ROUTING']:
+        route, reason = classify_turn(text, media_url=media_url, max_light_chars=current_app.config['HR_AGENT_LIGHT_MAX_CHARS'])
+    logger.info(f"Routing turn from {phone_number} to the {route} model ({reason})")
+    
+    final_response = None
+    if route == LIGHT:
+        final_response = _run_light_turn(job_id, summary, contents)
+        if final_response is None:
+            route = ESCALATED
+    if final_response is None:
+        final_response = _run_full_turn(job_id, media_url, mime_type, summary, contents)
+    record_route(route, (time.perf_counter() - start) * 1000)
+    
+    if final_response:
+        save_turn(phone_number, text, final_response)
+        if needs_compaction:
+            schedule_compaction(phone_number, summarize_conversation)
+            
+    return final_response
@@ -0,0 +1,182 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional
+from flask import current_app
+from models import db, Application, Job, ConversationTurn, AIAnalysis
+from services.ai_service import analyze_with_ai
+from services.skills import add_application_skills
+from logger import logger
+
+
+def run_analysis(application_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Gather an application's WhatsApp conversation and job requirements and score it with the AI.
+
+    Only reads from the database, so it can run on any thread with an app context.
+
+    Args:
+        application_id: The ID of the application to analyze
+
+    Returns:
+        dict: The analysis result (analysis, key_strengths, match_score, skills), or None
+            if the application does not exist
+    """
+    application = Application.query.get(application_id)
+    if application is None:
+        return None
+
+    # Get the conversation the HR agent had with the applicant's number
+    turns = db.session.query(ConversationTurn.role, ConversationTurn.text) \
+        .filter(ConversationTurn.phone_number == application.whatsapp_number) \
+        .order_by(ConversationTurn.id) \
+        .all()
+    logger.info(f"Retrieved {len(turns)} conversation messages for analysis of application {application_id}")
+
+    conversation_text = "\n".join([f"{'Applicant' if role == 'user' else 'Bot'}: {text}" for role, text in turns])
+
+    # Extract job requirements
+    job = Job.query.get(application.job_id)
+    job_requirements = job.requirements
+
+    logger.info(f"Calling AI service to analyze application {application_id}")
+    analysis_result = analyze_with_ai(application, job_requirements, conversation_text)
+    logger.info(f"Received AI analysis for application {application_id} with match score: {analysis_result['match_score']}")
+    return analysis_result
+
+
+def save_analysis(application: Application, analysis_result: Dict[str, Any], existing_analysis: Optional[AIAnalysis] = None, with_skills: bool = True) -> int:
+    """
+    Stage an analysis result on the session: the AIAnalysis row with its match score, and the skills.
+
+    The caller commits.
+
+    Args:
+        application: The analyzed application
+        analysis_result: The result returned by run_analysis
+        existing_analysis: The application's current AIAnalysis, if already loaded
+        with_skills: Link the skills too; batch callers pass False and link all of a batch's
+            skills with one add_application_skills call
+
+    Returns:
+        int: The number of skills added to the application
+    """
+    # Skills first: new skill names are inserted on a connection of their own, which on
+    # SQLite would wait forever behind this session once it has flushed a write
+    skill_count = add_application_skills({application.id: analysis_result['skills']}) if with_skills else 0
+
+    if existing_analysis is None:
+        existing_analysis = AIAnalysis.query.filter_by(application_id=application.id).first()
+
+    if existing_analysis:
+        logger.info(f"Updating existing analysis for application {application.id}")
+        existing_analysis.analysis_text = analysis_result['analysis']
+        existing_analysis.key_strengths = analysis_result['key_strengths']
+        existing_analysis.match_score = analysis_result['match_score']
+    else:
+        logger.info(f"Creating new analysis for application {application.id}")
+        db.session.add(AIAnalysis(
+            application_id=application.id,
+            analysis_text=analysis_result['analysis'],
+            key_strengths=analysis_result['key_strengths'],
+            match_score=analysis_result['match_score']
+        ))
+    return skill_count
+
+
+def _commit_batch(results: Dict[int, Dict[str, Any]]) -> List[int]:
+    """Save a batch of analysis results in one transaction; returns the IDs saved"""
+    applications = Application.query.filter(Application.id.in_(list(results))).all()
+    analyses = {
+        analysis.application_id: analysis
+        for analysis in AIAnalysis.query.filter(AIAnalysis.application_id.in_(list(results)))
+    }
+    try:
+        add_application_skills({application.id: results[application.id]['skills'] for application in applications})
+        for application in applications:
+            save_analysis(application, results[application.id], analyses.get(application.id), with_skills=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [application.id for application in applications]
+
+
+def analyze_applications(
+    application_ids: List[int],
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze many applications, running up to `concurrency` AI calls at once.
+
+    Each analysis runs on a worker thread with its own app context and session. Results
+    are saved from the calling thread in transactions of `batch_size` applications, as
+    they complete, so the wall time is roughly len(application_ids) / concurrency AI calls.
+
+    Args:
+        application_ids: The IDs of the applications to analyze
+        concurrency: Maximum AI calls in flight (defaults to ANALYSIS_CONCURRENCY)
+        batch_size: Applications saved per transaction (defaults to ANALYSIS_COMMIT_BATCH_SIZE)
+        progress: Optional callback called with (done, total) after each application
+
+    Returns:
+        dict: {'analyzed': [ids], 'not_found': [ids], 'failed': {id: error}, 'elapsed_seconds': float}
+    """
+    config = current_app.config
+    concurrency = concurrency or config['ANALYSIS_CONCURRENCY']
+    batch_size = batch_size or config['ANALYSIS_COMMIT_BATCH_SIZE']
+    app = current_app._get_current_object()
+
+    application_ids = list(dict.fromkeys(application_ids))
+    total = len(application_ids)
+    summary = {'analyzed': [], 'not_found': [], 'failed': {}}
+    pending: Dict[int, Dict[str, Any]] = {}
+    done = 0
+    start = time.perf_counter()
+
+    def analyze(application_id):
+        with app.app_context():
+            return run_analysis(application_id)
+
+    def flush():
+        if not pending:
+            return
+        try:
+            summary['analyzed'].extend(_commit_batch(pending))
+            logger.info(f"Saved a batch of {len(pending)} analyses")
+        except Exception as e:
+            logger.error(f"Error saving a batch of {len(pending)} analyses", exc_info=True)
+            for application_id in pending:
+                summary['failed'][application_id] = f"Error saving analysis: {str(e)}"
+        pending.clear()
+
+    logger.info(f"Analyzing {total} applications with concurrency {concurrency}")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="analysis") as executor:
+        futures = {executor.submit(analyze, application_id): application_id for application_id in application_ids}
+        for future in as_completed(futures):
+            application_id = futures[future]
+            try:
+                result = future.result()
+                if result is None:
+                    summary['not_found'].append(application_id)
+                else:
+                    pending[application_id] = result
+            except Exception as e:
+                logger.error(f"Error analyzing application {application_id}", exc_info=True)
+                summary['failed'][application_id] = f"Error analyzing application: {str(e)}"
+
+            done += 1
+            if len(pending) >= batch_size:
+                flush()
+            if progress:
+                progress(done, total)
+            if done % batch_size == 0 or done == total:
+                logger.info(f"Analyzed {done}/{total} applications")
+        flush()
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    logger.info(f"Batch analysis finished: {len(summary['analyzed'])} analyzed, "
+                f"{len(summary['not_found'])} not found, {len(summary['failed'])} failed "
+                f"in {summary['elapsed_seconds']}s")
+    return summary
@@ -0,0 +1,176 @@
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Optional, Tuple, Dict, Hashable, Any
+from flask import Response, request, current_app
+from sqlalchemy import text
+from models import db, Job
+from services.serializers import serialize_jobs, dumps
+from logger import logger
+
+# Upper bound on cached values per catalog version (one per page/job requested)
+MAX_CACHE_ENTRIES = 256
+
+_lock = threading.Lock()
+_version = 0
+_version_checked_at = 0.0
+_cache: Dict[Hashable, Tuple[int, Any]] = {}
+
+
+def get_catalog_version() -> int:
+    """
+    Return the current version of the job catalog.
+
+    The version lives in the catalog_version table so every worker process sees the
+    same one. It is re-read at most once per CATALOG_VERSION_TTL_SECONDS; between
+    reads a bump made by another process may go unnoticed for that long.
+    """
+    global _version, _version_checked_at
+    now = time.monotonic()
+    if now - _version_checked_at < current_app.config.get('CATALOG_VERSION_TTL_SECONDS', 1):
+        return _version
+
+    try:
+        row = db.session.execute(text("SELECT version FROM catalog_version WHERE id = 1")).first()
+        version = row[0] if row else 0
+    except Exception:
+        db.session.rollback()
+        logger.error("Error reading job catalog version", exc_info=True)
+        return _version
+
+    with _lock:
+        if version != _version:
+            _version = version
+            _cache.clear()
+        _version_checked_at = now
+    return _version
+
+
+def bump_catalog_version() -> int:
+    """
+    Mark the job catalog as changed.
+
+    Must be called after every committed write to jobs or their questions, so cached
+    payloads, ETags and prompts from older versions stop being served by any process.
+
+    Returns:
+        int: The new catalog version
+    """
+    global _version, _version_checked_at
+    try:
+        updated = db.session.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1")).rowcount
+        if not updated:
+            # Databases created by create_all() start without the counter row
+            db.session.execute(text("INSERT INTO catalog_version (id, version) VALUES (1, 1)"))
+        version = db.session.execute(text("SELECT version FROM catalog_version WHERE id = 1")).scalar()
+        db.session.commit()
+        checked_at = time.monotonic()
+    except Exception:
+        db.session.rollback()
+        logger.error("Error bumping job catalog version", exc_info=True)
+        # Still drop this process's cache, and re-read the shared version on next use
+        version = _version + 1
+        checked_at = 0.0
+
+    with _lock:
+        _version = version
+        _version_checked_at = checked_at
+        _cache.clear()
+    logger.info(f"Job catalog version bumped to {version}")
+    return version
+
+
+def get_cached(key: Hashable, build: Callable[[], Any]) -> Any:
+    """
+    Return the value cached for key at the current catalog version, building it on a miss.
+
+    Args:
+        key: Identifies the value (e.g. a page of the listing or a single job)
+        build: Computes the value; a None result is returned but not cached
+
+    Returns:
+        The cached or freshly built value
+    """
+    version = get_catalog_version()
+    entry = _cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    value = build()
+    if value is None:
+        return None
+
+    with _lock:
+        # Only store the value if no write happened while it was being built
+        if version == _version:
+            if len(_cache) >= MAX_CACHE_ENTRIES:
+                _cache.clear()
+            _cache[key] = (version, value)
+    return value
+
+
+def get_cached_payload(key: Hashable, build: Callable[[], Optional[Tuple[bytes, dict]]]) -> Optional[Tuple[bytes, str, dict]]:
+    """
+    Return the serialized payload for key at the current catalog version, building it on a miss.
+
+    Args:
+        key: Identifies the payload
+        build: Returns (body, headers) for the payload, or None if it does not exist
+
+    Returns:
+        tuple: (body, etag, headers), or None if build returned None
+    """
+    def build_with_etag():
+        built = build()
+        if built is None:
+            return None
+        body, headers = built
+        return body, hashlib.sha1(body).hexdigest(), headers
+
+    return get_cached(key, build_with_etag)
+
+
+def get_catalog_prompt(compact: bool = False) -> str:
+    """
+    Return the job catalog as rendered into the HR agent's system prompt.
+
+    The string is built once per catalog version, so assembling a prompt does not
+    query or serialize the jobs on every message.
+
+    Args:
+        compact: Only include each job's id, title and department
+
+    Returns:
+        str: JSON list of jobs
+    """
+    def build():
+        try:
+            if compact:
+                jobs = [
+                    {'id': job_id, 'jobTitle': title, 'department': department}
+                    for job_id, title, department in db.session.query(Job.id, Job.jobTitle, Job.department).order_by(Job.id)
+                ]
+            else:
+                jobs = serialize_jobs(Job.query.order_by(Job.id))
+            return dumps(jobs).decode('utf-8')
+        except Exception:
+            logger.error("Error rendering job catalog for prompt", exc_info=True)
+            return None
+
+    catalog = get_cached(('prompt', compact), build)
+    if catalog is None:
+        return json.dumps({"error": "Failed to retrieve jobs"})
+    return catalog
+
+
+def conditional_json_response(body: bytes, etag: str, headers: dict) -> Response:
+    """Build a JSON response with a strong ETag, or a bodyless 304 if the client already has it"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=200, mimetype='application/json')
+        response.headers.extend(headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from flask import current_app
+from models import db, ConversationTurn, ConversationSummary
+from services.metrics import increment
+from logger import logger
+
+# Rough token estimate used for budgeting; avoids a tokenizer call on the hot path
+CHARS_PER_TOKEN = 4
+
+_compaction_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-compaction")
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_conversation_context(phone_number: str) -> Tuple[List[Dict[str, Any]], Optional[str], bool]:
+    """
+    Load the recent conversation with a phone number that fits the history token budget.
+
+    Only turns after the running summary are considered, newest first, and at most
+    HR_AGENT_HISTORY_MAX_TURNS of them make up the window. HR_AGENT_COMPACT_AFTER_TURNS
+    more are read to tell whether enough turns sit outside it to compact, so the cost
+    and size of the window stay bounded however long the conversation is.
+
+    Args:
+        phone_number: The WhatsApp phone number of the user
+
+    Returns:
+        tuple: (contents, summary, needs_compaction) where contents is the window in
+            Gemini format (oldest first, starting with a user turn), summary is the
+            running summary of older turns or None, and needs_compaction tells whether
+            enough turns have fallen out of the window to fold them into the summary.
+    """
+    config = current_app.config
+    summary_row = ConversationSummary.query.get(phone_number)
+    summarized_through = summary_row.summarized_through if summary_row else 0
+
+    max_turns = config['HR_AGENT_HISTORY_MAX_TURNS']
+    compact_after = config['HR_AGENT_COMPACT_AFTER_TURNS']
+    turns = db.session.query(ConversationTurn.role, ConversationTurn.text) \
+        .filter(ConversationTurn.phone_number == phone_number, ConversationTurn.id > summarized_through) \
+        .order_by(ConversationTurn.id.desc()) \
+        .limit(max_turns + compact_after) \
+        .all()
+
+    budget = config['HR_AGENT_HISTORY_TOKEN_BUDGET']
+    window = []
+    for role, text in turns[:max_turns]:
+        cost = estimate_tokens(text)
+        if cost > budget:
+            break
+        budget -= cost
+        window.append({"role": role, "parts": [{"text": text}]})
+    window.reverse()
+
+    # Gemini expects the history to open with a user turn
+    while window and window[0]['role'] != 'user':
+        window.pop(0)
+
+    # Turns read beyond the window count as dropped too, so compaction runs once per
+    # compact_after turns rather than on every turn after the limit is reached
+    dropped = len(turns) - len(window)
+    needs_compaction = dropped >= compact_after
+    return window, summary_row.summary if summary_row else None, needs_compaction
+
+
+def save_turn(phone_number: str, user_text: str, model_text: str):
+    """Append a user message and the agent's reply to the conversation"""
+    try:
+        db.session.add_all([
+            ConversationTurn(phone_number=phone_number, role='user', text=user_text),
+            ConversationTurn(phone_number=phone_number, role='model', text=model_text),
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.error(f"Error saving conversation turn for {phone_number}", exc_info=True)
+
+
+def schedule_compaction(phone_number: str, summarize: Callable[[Optional[str], List[Tuple[str, str]]], str]):
+    """
+    Fold the turns that no longer fit the window into the running summary, in the background.
+
+    At most one compaction per phone number runs at a time.
+
+    Args:
+        phone_number: The WhatsApp phone number of the user
+        summarize: Takes (previous summary, [(role, text), ...]) and returns the new summary
+    """
+    with _compacting_lock:
+        if phone_number in _compacting:
+            return
+        _compacting.add(phone_number)
+
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                _compact(phone_number, summarize)
+        except Exception:
+            logger.error(f"Error compacting conversation for {phone_number}", exc_info=True)
+        finally:
+            with _compacting_lock:
+                _compacting.discard(phone_number)
+
+    _compaction_executor.submit(run)
+
+
+def _compact(phone_number: str, summarize: Callable[[Optional[str], List[Tuple[str, str]]], str]):
+    config = current_app.config
+    summary_row = ConversationSummary.query.get(phone_number)
+    summarized_through = summary_row.summarized_through if summary_row else 0
+
+    # Keep the turns that still fit in the window out of the summary
+    window, _, _ = get_conversation_context(phone_number)
+    turns = db.session.query(ConversationTurn.id, ConversationTurn.role, ConversationTurn.text) \
+        .filter(ConversationTurn.phone_number == phone_number, ConversationTurn.id > summarized_through) \
+        .order_by(ConversationTurn.id) \
+        .all()
+    older = turns[:len(turns) - len(window)]
+    if not older:
+        return
+
+    summary = summarize(summary_row.summary if summary_row else None, [(role, text) for _, role, text in older])
+    summary = summary[:config['HR_AGENT_SUMMARY_MAX_CHARS']]
+
+    if summary_row is None:
+        summary_row = ConversationSummary(phone_number=phone_number, summary=summary, summarized_through=older[-1][0])
+        db.session.add(summary_row)
+    else:
+        summary_row.summary = summary
+        summary_row.summarized_through = older[-1][0]
+    db.session.commit()
+    increment('conversation_compactions')
+    logger.info(f"Compacted {len(older)} conversation turns for {phone_number}")
@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, ProcessedMessage
+from services.metrics import increment
+from logger import logger
+
+# Delete expired rows from the table every this many recorded messages
+PURGE_EVERY = 1000
+
+
+class MessageDeduplicator:
+    """
+    Remembers recently seen message IDs so redelivered webhook events can be dropped.
+
+    IDs are kept in a bounded in-memory LRU with a TTL. With persistent=True they are
+    also recorded in the processed_message table, which lets every worker process
+    see IDs first seen by another one. The table check runs only on a memory miss.
+    """
+
+    def __init__(self, ttl: float = 86400, max_size: int = 100000, persistent: bool = False):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+        self._recorded = 0
+
+    def seen(self, message_id: str) -> bool:
+        """
+        Check whether message_id was seen within the TTL, recording it if not.
+
+        Returns:
+            bool: True for a redelivery, False the first time an ID is seen
+        """
+        increment('whatsapp_dedup_checks')
+        now = time.time()
+        with self._lock:
+            seen_at = self._seen.get(message_id)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._seen.move_to_end(message_id)
+                increment('whatsapp_dedup_hits')
+                return True
+            self._remember(message_id, now)
+
+        if self.persistent and self._seen_in_table(message_id):
+            increment('whatsapp_dedup_hits')
+            return True
+        return False
+
+    def forget(self, message_id: str):
+        """Drop message_id, so a redelivery is processed (used when handling the first delivery failed)"""
+        with self._lock:
+            self._seen.pop(message_id, None)
+        if self.persistent:
+            try:
+                ProcessedMessage.query.filter_by(message_id=message_id).delete()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.error(f"Error forgetting message ID {message_id}", exc_info=True)
+
+    def _remember(self, message_id: str, now: float):
+        self._seen[message_id] = now
+        self._seen.move_to_end(message_id)
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+    def _seen_in_table(self, message_id: str) -> bool:
+        """
+        Insert message_id into the table; an existing unexpired row means a redelivery.
+
+        Fails open: if the table can't be read or written (e.g. the database is
+        locked), the message is treated as new rather than dropped.
+        """
+        now = datetime.now()
+        try:
+            try:
+                db.session.add(ProcessedMessage(message_id=message_id, seen_at=now))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                row = ProcessedMessage.query.get(message_id)
+                if row is not None and now - row.seen_at < timedelta(seconds=self.ttl):
+                    return True
+                # The old row has expired: treat this as a new message
+                if row is not None:
+                    row.seen_at = now
+                    db.session.commit()
+                return False
+        except Exception:
+            db.session.rollback()
+            increment('whatsapp_dedup_errors')
+            logger.error(f"Error checking message ID {message_id} in the processed message table", exc_info=True)
+            return False
+
+        self._recorded += 1
+        if self._recorded % PURGE_EVERY == 0:
+            self._purge_table(now)
+        return False
+
+    def _purge_table(self, now: datetime):
+        try:
+            deleted = ProcessedMessage.query.filter(ProcessedMessage.seen_at < now - timedelta(seconds=self.ttl)).delete()
+            db.session.commit()
+            logger.info(f"Purged {deleted} expired processed message IDs")
+        except Exception:
+            db.session.rollback()
+            logger.error("Error purging processed message IDs", exc_info=True)
+
+
+def init_message_dedup(app) -> MessageDeduplicator:
+    """
+    Create the application's message deduplicator from its config.
+
+    Returns:
+        MessageDeduplicator: Also available as app.extensions['message_dedup']
+    """
+    dedup = MessageDeduplicator(
+        ttl=app.config['WHATSAPP_DEDUP_TTL_SECONDS'],
+        max_size=app.config['WHATSAPP_DEDUP_MAX_SIZE'],
+        persistent=app.config['WHATSAPP_DEDUP_PERSISTENT']
+    )
+    app.extensions['message_dedup'] = dedup
+    return dedup
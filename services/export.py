@@ -0,0 +1,106 @@
+import io
+import csv
+from typing import Optional, Iterator
+from models import db, Application, Answer
+from services.serializers import dumps
+
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    'application_id',
+    'job_id',
+    'applicant_name',
+    'whatsapp_number',
+    'resume_url',
+    'status',
+    'ai_summary',
+    'applied_at',
+    'question',
+    'answer',
+    'required',
+]
+
+
+def _export_rows(job_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Stream application rows joined with their answers, ordered by application.
+
+    The query runs on a server-side cursor and is fetched chunk_size rows at a time,
+    so only one chunk is held in memory. Applications without answers yield one row
+    with the answer columns set to None.
+    """
+    query = db.session.query(
+        Application.id,
+        Application.job_id,
+        Application.applicant_name,
+        Application.whatsapp_number,
+        Application.resume_url,
+        Application.status,
+        Application.ai_summary,
+        Application.applied_at,
+        Answer.question_text,
+        Answer.answer_text,
+        Answer.required,
+    ).outerjoin(Answer, Answer.application_id == Application.id)
+
+    if job_id is not None:
+        query = query.filter(Application.job_id == job_id)
+
+    return query.order_by(Application.id, Answer.id) \
+        .execution_options(stream_results=True) \
+        .yield_per(chunk_size)
+
+
+def generate_ndjson(job_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield applications as newline-delimited JSON, one application (with its answers) per line.
+
+    Rows arrive ordered by application id, so answers are grouped by watching for the id
+    to change instead of collecting them per application up front.
+    """
+    buffer = []
+    current = None
+    for (application_id, app_job_id, applicant_name, whatsapp_number, resume_url, status,
+         ai_summary, applied_at, question, answer, required) in _export_rows(job_id, chunk_size):
+        if current is None or current['id'] != application_id:
+            if current is not None:
+                buffer.append(dumps(current))
+                if len(buffer) >= chunk_size:
+                    yield b"\n".join(buffer) + b"\n"
+                    buffer = []
+            current = {
+                'id': application_id,
+                'applicant_name': applicant_name,
+                'whatsapp_number': whatsapp_number,
+                'resume_url': resume_url,
+                'status': status,
+                'ai_summary': ai_summary,
+                'applied_at': applied_at.isoformat() if applied_at else None,
+                'job_id': app_job_id,
+                'answers': []
+            }
+        if question is not None:
+            current['answers'].append({'question': question, 'answer': answer, 'required': required})
+
+    if current is not None:
+        buffer.append(dumps(current))
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+
+def generate_csv(job_id: Optional[int] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield applications as CSV text, one row per answer, starting with a header row"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_COLUMNS)
+
+    for i, row in enumerate(_export_rows(job_id, chunk_size), start=1):
+        row = list(row)
+        row[7] = row[7].isoformat() if row[7] else ''
+        writer.writerow(row)
+        if i % chunk_size == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    yield output.getvalue()
@@ -0,0 +1,216 @@
+import os
+import re
+import json
+import time
+import random
+import inspect
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional
+from dotenv import load_dotenv
+from logger import logger
+
+# Load environment variables
+load_dotenv()
+
+
+@dataclass
+class LLMResponse:
+    """Minimal response returned by fake backends, shaped like the parts of a Gemini response we read"""
+    text: Optional[str]
+    usage_metadata: Any = None
+    automatic_function_calling_history: List[Any] = field(default_factory=list)
+
+
+class LLMBackend(ABC):
+    """Interface for the model behind the agents: generate_content(model, config, contents)"""
+
+    name = "base"
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    def generate_content(self, model: str, config: Any = None, contents: Any = None):
+        """Return a response with .text (and, for Gemini, usage and function calling history)"""
+
+    @abstractmethod
+    def generate_content_stream(self, model: str, config: Any = None, contents: Any = None) -> Iterator[Any]:
+        """Yield response chunks with a .text each"""
+
+
+class GeminiBackend(LLMBackend):
+    """The real Gemini API through google-genai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str]):
+        from google import genai
+        self.api_key = api_key
+        self.client = genai.Client(api_key=api_key)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def generate_content(self, model: str, config: Any = None, contents: Any = None):
+        return self.client.models.generate_content(model=model, config=config, contents=contents)
+
+    def generate_content_stream(self, model: str, config: Any = None, contents: Any = None) -> Iterator[Any]:
+        return self.client.models.generate_content_stream(model=model, config=config, contents=contents)
+
+
+class FakeLLMError(Exception):
+    """Injected failure raised by FakeLLMBackend"""
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Offline stand-in for Gemini, for load tests and local development.
+
+    Each call sleeps for a latency drawn around latency_ms, fails with FakeLLMError at
+    error_rate, and with tool_call_rate runs tool_rounds rounds of "function calls":
+    the tools passed in config.tools are called in-process with arguments guessed
+    from the user message, like automatic function calling would, and each round
+    adds another model latency. Calls asking for JSON (response_mime_type) get an
+    application analysis built from the prompt.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 800, jitter: float = 0.3, error_rate: float = 0.0,
+                 tool_call_rate: float = 0.5, tool_rounds: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tool_call_rate = tool_call_rate
+        self.tool_rounds = tool_rounds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _sleep(self, fraction: float = 1.0):
+        latency = self.latency_ms * fraction * random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(latency, 0) / 1000)
+
+    @staticmethod
+    def _last_user_text(contents) -> str:
+        if isinstance(contents, str):
+            return contents
+        for content in reversed(contents or []):
+            parts = content.get('parts', []) if isinstance(content, dict) else getattr(content, 'parts', []) or []
+            for part in parts:
+                text = part.get('text') if isinstance(part, dict) else getattr(part, 'text', None)
+                if text:
+                    return text
+        return ""
+
+    @staticmethod
+    def _guess_args(tool, text: str) -> Optional[dict]:
+        """Build arguments for a tool call, or None if a required argument can't be guessed"""
+        numbers = re.findall(r"\d+", text)
+        args = {}
+        for name, param in inspect.signature(tool).parameters.items():
+            if name == 'job_id':
+                args[name] = int(numbers[0]) if numbers else 1
+            elif name in ('query', 'text'):
+                args[name] = text.split()[-1] if text.split() else text
+            elif name == 'applicant_name':
+                args[name] = "Load Test"
+            elif name == 'whatsapp_number':
+                args[name] = "0000000000"
+            elif param.default is inspect.Parameter.empty:
+                return None
+        return args
+
+    def _call_tools(self, config, text: str) -> List[str]:
+        called = []
+        tools = list(getattr(config, 'tools', None) or [])
+        # Only submit an application when the candidate asks to
+        if not re.search(r"\b(apply|submit)\b", text, re.IGNORECASE):
+            tools = [t for t in tools if getattr(t, '__name__', '') != 'submit_application']
+        callable_tools = [t for t in tools if callable(t)]
+        if not callable_tools:
+            return called
+        for _ in range(self.tool_rounds):
+            self._sleep()
+            tool = random.choice(callable_tools)
+            args = self._guess_args(tool, text)
+            if args is None:
+                continue
+            try:
+                tool(**args)
+            except Exception:
+                logger.error(f"Fake LLM tool call {tool.__name__} failed", exc_info=True)
+            called.append(tool.__name__)
+        return called
+
+    @staticmethod
+    def _json_reply(text: str) -> str:
+        """An analysis-shaped JSON reply, with skills taken from the words of the prompt"""
+        words = sorted(set(re.findall(r"\b[A-Z][A-Za-z+#]{2,}\b", text)))
+        skills = random.sample(words, min(len(words), 5))
+        return json.dumps({
+            "analysis": f"Fake analysis of a {len(text)} character prompt",
+            "key_strengths": ", ".join(skills) or "None found",
+            "match_score": random.randint(0, 100),
+            "skills": skills,
+        })
+
+    def _start(self, model: str, config: Any, contents: Any) -> str:
+        """Count the call, run any tool rounds and return the reply text"""
+        with self._lock:
+            self.calls += 1
+        text = self._last_user_text(contents)
+        if getattr(config, 'response_mime_type', None) == 'application/json':
+            return self._json_reply(text)
+
+        called = []
+        if random.random() < self.tool_call_rate:
+            called = self._call_tools(config, text)
+
+        reply = f"[fake {model}] You said: {text[:200]}"
+        if called:
+            reply += f" (looked up: {', '.join(called)})"
+        return reply
+
+    def generate_content(self, model: str, config: Any = None, contents: Any = None):
+        reply = self._start(model, config, contents)
+        self._sleep()
+        if random.random() < self.error_rate:
+            raise FakeLLMError("Injected fake LLM failure")
+        return LLMResponse(text=reply)
+
+    def generate_content_stream(self, model: str, config: Any = None, contents: Any = None) -> Iterator[LLMResponse]:
+        """Yield the reply a few words at a time: a quarter of the latency before the first chunk, the rest spread over the others"""
+        reply = self._start(model, config, contents)
+        self._sleep(0.25)
+        if random.random() < self.error_rate:
+            raise FakeLLMError("Injected fake LLM failure")
+
+        words = reply.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "") for i in range(0, len(words), 4)]
+        for i, chunk in enumerate(chunks):
+            if i:
+                self._sleep(0.75 / max(len(chunks) - 1, 1))
+            yield LLMResponse(text=chunk)
+
+
+def create_llm_backend() -> LLMBackend:
+    """
+    Create the backend selected by LLM_BACKEND ('gemini' by default, or 'fake').
+
+    The fake backend reads FAKE_LLM_LATENCY_MS, FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_TOOL_CALL_RATE and FAKE_LLM_TOOL_ROUNDS.
+    """
+    backend = os.getenv('LLM_BACKEND', 'gemini')
+    if backend == 'fake':
+        logger.info("Using fake LLM backend")
+        return FakeLLMBackend(
+            latency_ms=float(os.getenv('FAKE_LLM_LATENCY_MS', 800)),
+            error_rate=float(os.getenv('FAKE_LLM_ERROR_RATE', 0.0)),
+            tool_call_rate=float(os.getenv('FAKE_LLM_TOOL_CALL_RATE', 0.5)),
+            tool_rounds=int(os.getenv('FAKE_LLM_TOOL_ROUNDS', 1))
+        )
+    return GeminiBackend(api_key=os.getenv('GEMINI_API_KEY'))
@@ -0,0 +1,29 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(int)
+_gauges: Dict[str, Any] = {}
+
+
+def increment(name: str, value: float = 1):
+    """Add value to a process-wide counter"""
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value: Any):
+    """Record the current value of a process-wide gauge"""
+    with _lock:
+        _gauges[name] = value
+
+
+def get_counter(name: str) -> float:
+    return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Return a copy of all counters and gauges"""
+    with _lock:
+        return {'counters': dict(_counters), 'gauges': dict(_gauges)}
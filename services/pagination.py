@@ -0,0 +1,74 @@
+from typing import Optional, Tuple, List, Any, Callable
+from flask import current_app
+
+
+def parse_page_args(args) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Read the keyset pagination parameters from a request's query string.
+
+    A request with neither limit nor after is not paginated, so clients that predate
+    pagination keep getting the full list; with only after, pages are PAGE_SIZE_DEFAULT.
+
+    Args:
+        args: The request args (werkzeug MultiDict)
+
+    Returns:
+        tuple: (limit, after) where limit is None for the full list and after is the last id seen or None
+
+    Raises:
+        ValueError: If limit or after are not valid positive integers
+    """
+    default_limit = current_app.config.get('PAGE_SIZE_DEFAULT', 100)
+    max_limit = current_app.config.get('PAGE_SIZE_MAX', 500)
+
+    limit = args.get('limit')
+    if limit is None and args.get('after') is None:
+        return None, None
+    if limit is None:
+        limit = default_limit
+    elif limit.isdigit() and int(limit) > 0:
+        limit = min(int(limit), max_limit)
+    else:
+        raise ValueError("limit must be a positive integer")
+
+    after = args.get('after')
+    if after is not None:
+        if not after.isdigit():
+            raise ValueError("after must be a positive integer")
+        after = int(after)
+
+    return limit, after
+
+
+def keyset_page(query, model, limit: Optional[int], after: Optional[int] = None, serialize: Optional[Callable] = None) -> Tuple[List[Any], Optional[int]]:
+    """
+    Fetch one page of a query ordered by primary key.
+
+    Rows are selected with `id > after` instead of an OFFSET, so the cost of a page
+    does not depend on how deep into the table it is.
+
+    Args:
+        query: The base query (filters already applied)
+        model: The model whose `id` column is used as the cursor
+        limit: Maximum number of rows in the page, or None for all of them
+        after: Optional id of the last row of the previous page
+        serialize: Optional callable that takes the page query and returns dicts with an 'id' key.
+            Defaults to returning the ORM objects.
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+    """
+    if after is not None:
+        query = query.filter(model.id > after)
+    if limit is None:
+        query = query.order_by(model.id)
+        return (serialize(query) if serialize else query.all()), None
+
+    # Fetch one extra row to know whether another page exists
+    query = query.order_by(model.id).limit(limit + 1)
+    rows = serialize(query) if serialize else query.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, last['id'] if isinstance(last, dict) else last.id
+    return rows, None
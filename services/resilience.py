@@ -0,0 +1,256 @@
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, Optional, Any
+from flask import current_app
+from services.metrics import increment, set_gauge
+from logger import logger
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a turn's time budget runs out before a call finishes"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+class Deadline:
+    """A point in time by which a turn must finish, shared by the model call and its tools"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar('turn_deadline', default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Give the enclosed turn a time budget. A nested scope can only shorten it.
+
+    Yields:
+        Deadline: The deadline in effect
+    """
+    outer = _current_deadline.get()
+    deadline = Deadline(seconds)
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is erroring or slow.
+
+    The breaker keeps the outcomes of the last `window` calls. Once at least `min_calls`
+    are recorded and the share of failures (errors and timeouts) reaches `failure_rate`,
+    or the share of calls slower than `slow_call_seconds` reaches `slow_call_rate`, it
+    opens and rejects calls for `open_seconds`. After that a single trial call is let
+    through (half open): success closes the breaker, failure opens it again.
+
+    A timeout only counts as a failure when the call had at least `min_budget_seconds`;
+    a turn that is already out of time says nothing about the upstream's health.
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 10, slow_call_rate: float = 0.8, open_seconds: float = 30,
+                 min_budget_seconds: float = 1, max_workers: int = 16):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.min_budget_seconds = min_budget_seconds
+        self.state = 'closed'
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        # Calls run on this pool so a hung upstream can't hold the caller past its deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-call")
+        set_gauge(f"{name}_breaker_state", self.state)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"{self.name} circuit breaker {self.state} -> {state}")
+            self.state = state
+            set_gauge(f"{self.name}_breaker_state", state)
+            if state == 'open':
+                increment(f"{self.name}_breaker_opened")
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._set_state('half_open')
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def _record(self, failed: bool, elapsed: float):
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                if failed or slow:
+                    self._opened_at = time.monotonic()
+                    self._set_state('open')
+                else:
+                    self._outcomes.clear()
+                    self._set_state('closed')
+                return
+
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._outcomes.clear()
+                self._opened_at = time.monotonic()
+                self._set_state('open')
+
+    def _release_trial(self):
+        """End a half-open trial call without an outcome, so the next call can be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def call(self, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run func through the breaker, waiting at most timeout seconds for it.
+
+        Args:
+            func: The upstream call; runs on the breaker's pool with the caller's context variables
+            timeout: Seconds to wait, e.g. the remaining turn budget. None waits indefinitely.
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            CircuitOpenError: The breaker is open, func was not called
+            DeadlineExceeded: No time was left to call func, or it did not finish in time (it
+                keeps running in the background)
+        """
+        if timeout is not None and timeout <= 0:
+            increment(f"{self.name}_deadline_skips")
+            raise DeadlineExceeded(f"{self.name} call skipped: the time budget is exhausted")
+        if not self._allow():
+            increment(f"{self.name}_breaker_rejections")
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        context = contextvars.copy_context()
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                return func()
+
+        start = time.monotonic()
+        future = self._executor.submit(context.run, run)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Drop the call if it is still queued behind others on the pool
+            future.cancel()
+            increment(f"{self.name}_timeouts")
+            if timeout >= self.min_budget_seconds:
+                self._record(True, time.monotonic() - start)
+            else:
+                self._release_trial()
+            raise DeadlineExceeded(f"{self.name} call did not finish within {timeout:.1f}s")
+        except Exception:
+            increment(f"{self.name}_errors")
+            self._record(True, time.monotonic() - start)
+            raise
+        self._record(False, time.monotonic() - start)
+        return result
+
+    def stream(self, func: Callable[[], Iterable[Any]], deadline: Optional[Deadline] = None) -> Iterator[Any]:
+        """
+        Iterate a streaming upstream call through the breaker.
+
+        Chunks are passed through as they arrive, on the caller's thread. The stream is
+        cut with DeadlineExceeded once the deadline passes; a single blocked read is
+        bounded by the upstream's own timeout, not by the breaker.
+
+        Raises:
+            CircuitOpenError: The breaker is open, func was not called
+            DeadlineExceeded: The deadline passed before the stream finished
+        """
+        if not self._allow():
+            increment(f"{self.name}_breaker_rejections")
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        start = time.monotonic()
+        try:
+            for chunk in func():
+                if deadline is not None and deadline.expired:
+                    increment(f"{self.name}_timeouts")
+                    self._record(True, time.monotonic() - start)
+                    raise DeadlineExceeded(f"{self.name} stream did not finish within {deadline.seconds:.1f}s")
+                yield chunk
+        except DeadlineExceeded:
+            raise
+        except GeneratorExit:
+            # The client went away; that says nothing about the upstream's health
+            with self._lock:
+                self._trial_in_flight = False
+            raise
+        except Exception:
+            increment(f"{self.name}_errors")
+            self._record(True, time.monotonic() - start)
+            raise
+        self._record(False, time.monotonic() - start)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for an upstream, configured from the LLM_BREAKER_* settings"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        config = current_app.config
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    window=config['LLM_BREAKER_WINDOW'],
+                    min_calls=config['LLM_BREAKER_MIN_CALLS'],
+                    failure_rate=config['LLM_BREAKER_FAILURE_RATE'],
+                    slow_call_seconds=config['LLM_BREAKER_SLOW_CALL_SECONDS'],
+                    slow_call_rate=config['LLM_BREAKER_SLOW_CALL_RATE'],
+                    open_seconds=config['LLM_BREAKER_OPEN_SECONDS'],
+                    min_budget_seconds=config['LLM_BREAKER_MIN_BUDGET_SECONDS'],
+                )
+                _breakers[name] = breaker
+    return breaker
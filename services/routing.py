@@ -0,0 +1,57 @@
+import re
+from typing import Optional, Tuple
+from services.metrics import increment
+
+LIGHT = 'light'
+FULL = 'full'
+ESCALATED = 'escalated'
+ROUTES = (LIGHT, FULL, ESCALATED)
+
+# Anything about jobs, screening or applying needs the catalog or the tools
+TOOL_INTENT = re.compile(
+    r"\b(jobs?|positions?|roles?|openings?|vacanc\w*|hiring|apply\w*|applications?|submit\w*|"
+    r"requirements?|qualifications?|skills?|salary|pay|experience|questions?|interview\w*|"
+    r"resume|cv|department|location|remote|shift|details?|status)\b",
+    re.IGNORECASE,
+)
+# A message made only of these phrases (with punctuation or emoji around them) is small
+# talk. Yes/no are left out: they usually answer a screening question.
+SMALL_TALK_PHRASE = (
+    r"(hi+|hey+|hello+|hola|namaste|good (morning|afternoon|evening|night)|thanks?( you)?|thank u|thx|ty|"
+    r"ok(ay)?|k|cool|great|nice|got it|bye|goodbye|see you|there|sir|ma'?am|so much|a lot)"
+)
+SMALL_TALK = re.compile(rf"[\W_]*{SMALL_TALK_PHRASE}([\W_]+{SMALL_TALK_PHRASE})*[\W_]*", re.IGNORECASE)
+
+
+def classify_turn(text: str, media_url: Optional[str] = None, max_light_chars: int = 120) -> Tuple[str, str]:
+    """
+    Decide which model configuration a turn needs, from the message alone.
+
+    Messages that are nothing but small talk (greetings, thanks, acknowledgements) go
+    to the light route; anything else, and anything longer, with media, a number
+    (usually a job id) or a job-related keyword, goes to the full model with the
+    catalog and tools.
+
+    Returns:
+        tuple: (route, reason)
+    """
+    text = (text or "").strip()
+    if media_url:
+        return FULL, "media"
+    if not text:
+        return FULL, "empty"
+    if len(text) > max_light_chars:
+        return FULL, "long"
+    if re.search(r"\d", text):
+        return FULL, "number"
+    if TOOL_INTENT.search(text):
+        return FULL, "tool_intent"
+    if SMALL_TALK.fullmatch(text):
+        return LIGHT, "small_talk"
+    return FULL, "default"
+
+
+def record_route(route: str, elapsed_ms: float):
+    """Count a finished turn and its latency under the route that answered it"""
+    increment(f'hr_agent_route_{route}_turns')
+    increment(f'hr_agent_route_{route}_ms', elapsed_ms)
@@ -0,0 +1,131 @@
+import json
+from typing import List, Dict, Any
+from flask import Response
+from models import db, Job, Question, Application, Answer
+
+# orjson is optional; fall back to the stdlib encoder when it is not installed
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_JOB_COLUMNS = (
+    Job.id,
+    Job.jobTitle,
+    Job.department,
+    Job.description,
+    Job.requirements,
+    Job.aiInstructions,
+    Job.created_at,
+    Job.updated_at,
+)
+
+_APPLICATION_COLUMNS = (
+    Application.id,
+    Application.applicant_name,
+    Application.whatsapp_number,
+    Application.resume_url,
+    Application.status,
+    Application.ai_summary,
+    Application.applied_at,
+    Application.job_id,
+)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def serialize_jobs(query) -> List[Dict[str, Any]]:
+    """
+    Serialize the jobs selected by a query, with their questions.
+
+    Only plain column tuples are fetched, so no ORM objects are built. Questions for
+    all jobs are loaded with one extra query and grouped per job in a single pass.
+    The output matches Job.to_dict().
+
+    Args:
+        query: A Job query (filters, ordering and limit already applied)
+
+    Returns:
+        list: One dict per job, in query order
+    """
+    jobs = []
+    by_id = {}
+    for (job_id, title, department, description, requirements,
+         ai_instructions, created_at, updated_at) in query.with_entities(*_JOB_COLUMNS):
+        job = {
+            'id': job_id,
+            'jobTitle': title,
+            'department': department,
+            'description': description,
+            'requirements': requirements,
+            'aiInstructions': ai_instructions,
+            'created_at': _isoformat(created_at),
+            'updated_at': _isoformat(updated_at),
+            'questions': []
+        }
+        jobs.append(job)
+        by_id[job_id] = job['questions']
+
+    if by_id:
+        questions = db.session.query(Question.job_id, Question.id, Question.text, Question.required) \
+            .filter(Question.job_id.in_(list(by_id))) \
+            .order_by(Question.job_id, Question.id)
+        for job_id, question_id, text, required in questions:
+            by_id[job_id].append({'id': question_id, 'text': text, 'required': required})
+
+    return jobs
+
+
+def serialize_applications(query) -> List[Dict[str, Any]]:
+    """
+    Serialize the applications selected by a query, with their answers.
+
+    Works like serialize_jobs: one query for the applications, one for all of their
+    answers. The output matches Application.to_dict().
+
+    Args:
+        query: An Application query (filters, ordering and limit already applied)
+
+    Returns:
+        list: One dict per application, in query order
+    """
+    applications = []
+    by_id = {}
+    for (application_id, applicant_name, whatsapp_number, resume_url, status,
+         ai_summary, applied_at, job_id) in query.with_entities(*_APPLICATION_COLUMNS):
+        application = {
+            'id': application_id,
+            'applicant_name': applicant_name,
+            'whatsapp_number': whatsapp_number,
+            'resume_url': resume_url,
+            'status': status,
+            'ai_summary': ai_summary,
+            'applied_at': _isoformat(applied_at),
+            'job_id': job_id,
+            'answers': []
+        }
+        applications.append(application)
+        by_id[application_id] = application['answers']
+
+    if by_id:
+        answers = db.session.query(Answer.application_id, Answer.question_text, Answer.answer_text, Answer.required) \
+            .filter(Answer.application_id.in_(list(by_id))) \
+            .order_by(Answer.application_id, Answer.id)
+        for application_id, question_text, answer_text, required in answers:
+            by_id[application_id].append({'question': question_text, 'answer': answer_text, 'required': required})
+
+    return applications
+
+
+def dumps(obj) -> bytes:
+    """Encode obj as compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status: int = 200) -> Response:
+    """Build a JSON response without going through jsonify's stdlib encoder"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
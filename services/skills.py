@@ -0,0 +1,147 @@
+import re
+import threading
+from typing import Dict, Iterable, List
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Application, Skill
+from logger import logger
+
+# Upper bound on cached skill names; the skill vocabulary is expected to stay far below it
+MAX_CACHED_SKILLS = 50000
+
+_lock = threading.Lock()
+_skill_ids: Dict[str, int] = {}
+
+
+def normalize_skill_name(name: str) -> str:
+    """Key under which a skill is interned: trimmed, single-spaced and case-insensitive"""
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+def _insert_ignoring_duplicates(table):
+    """INSERT that skips rows whose unique key already exists, on the dialects that support it"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return table.insert().prefix_with('IGNORE')  # MySQL
+
+
+def _match_skills(conn, keys: List[str], condition) -> Dict[str, int]:
+    """Skills matching condition whose normalized name is one of keys, by normalized name"""
+    keys = set(keys)
+    matches = {}
+    for skill_id, name in conn.execute(select(Skill.id, Skill.name).where(condition).order_by(Skill.id)):
+        key = normalize_skill_name(name)
+        if key in keys:
+            matches.setdefault(key, skill_id)
+    return matches
+
+
+def get_skill_ids(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Return the IDs of skills by name, creating the ones that don't exist yet.
+
+    Names are interned process-wide, so known skills cost no query. Unknown ones are
+    looked up in one query and the rest inserted in one statement, in their own
+    transaction: skills are a shared dictionary, so they are kept even if the caller's
+    transaction rolls back, and the cache only ever holds committed IDs.
+
+    Args:
+        names: Skill names as extracted by the AI, in any case and spacing
+
+    Returns:
+        dict: Normalized skill name -> skill ID
+    """
+    display_names = {}
+    for name in names:
+        if name and name.strip():
+            display_names.setdefault(normalize_skill_name(name), re.sub(r"\s+", " ", name).strip())
+
+    ids = {key: _skill_ids[key] for key in display_names if key in _skill_ids}
+    missing = [key for key in display_names if key not in ids]
+    if not missing:
+        return ids
+
+    # SQL lower() is ASCII-only on some databases and doesn't collapse inner spaces, so
+    # the query only narrows the candidates and the match is made in Python
+    normalized_column = func.lower(func.trim(Skill.name))
+    with db.engine.begin() as conn:
+        found = _match_skills(conn, missing, or_(
+            normalized_column.in_(missing),
+            Skill.name.in_([display_names[key] for key in missing]),
+        ))
+        new = [key for key in missing if key not in found]
+        if new:
+            logger.info(f"Creating {len(new)} new skills")
+            conn.execute(_insert_ignoring_duplicates(Skill.__table__), [{'name': display_names[key]} for key in new])
+            # Read back the new IDs by the exact names inserted, including rows a concurrent writer inserted first
+            found.update(_match_skills(conn, new, Skill.name.in_([display_names[key] for key in new])))
+
+    with _lock:
+        if len(_skill_ids) + len(found) > MAX_CACHED_SKILLS:
+            _skill_ids.clear()
+        _skill_ids.update(found)
+    ids.update(found)
+    return ids
+
+
+def add_application_skills(skills_by_application: Dict[int, List[str]]) -> int:
+    """
+    Link applications to skills in bulk, skipping links that already exist.
+
+    Runs one query for the existing links and one multi-row insert for the new ones on
+    the current session; the caller commits.
+
+    Args:
+        skills_by_application: Application ID -> skill names
+
+    Returns:
+        int: The number of links added
+    """
+    if not skills_by_application:
+        return 0
+
+    skill_ids = get_skill_ids(name for names in skills_by_application.values() for name in names)
+
+    # The association table and its columns come from the Application.skills relationship
+    relationship = Application.skills.property
+    links = relationship.secondary
+    application_column = relationship.synchronize_pairs[0][1]
+    skill_column = relationship.secondary_synchronize_pairs[0][1]
+
+    wanted = set()
+    for application_id, names in skills_by_application.items():
+        for name in names:
+            if not name or not name.strip():
+                continue
+            skill_id = skill_ids.get(normalize_skill_name(name))
+            if skill_id is None:
+                # Only possible if the skill could neither be found nor created; don't fail the batch for it
+                logger.warning(f"No skill ID for {name!r}, not linking it to application {application_id}")
+                continue
+            wanted.add((application_id, skill_id))
+    if not wanted:
+        return 0
+
+    existing = {
+        (application_id, skill_id)
+        for application_id, skill_id in db.session.execute(
+            select(application_column, skill_column).where(application_column.in_(list(skills_by_application)))
+        )
+    }
+    new_links = wanted - existing
+    if new_links:
+        db.session.execute(links.insert(), [
+            {application_column.name: application_id, skill_column.name: skill_id}
+            for application_id, skill_id in sorted(new_links)
+        ])
+    logger.info(f"Added {len(new_links)} skill links to {len(skills_by_application)} applications")
+    return len(new_links)
+
+
+def clear_skill_cache():
+    """Forget the interned skill IDs, e.g. after skills were deleted or merged"""
+    with _lock:
+        _skill_ids.clear()
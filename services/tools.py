@@ -1,9 +1,123 @@
 import json
-from typing import Optional, List
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+from sqlalchemy import or_, event
+from sqlalchemy.engine import Engine
 from models import db, Job, Question, Application, Answer
+from services.serializers import serialize_jobs, dumps
+from services.resilience import current_deadline
 from datetime import datetime
 from logger import logger
 
+
+@dataclass
+class ToolCallStats:
+    """Tool calls and DB queries made during one agent turn, plus the turn's memoized tool results"""
+    tool_calls: int = 0
+    cache_hits: int = 0
+    db_queries: int = 0
+    cache: Dict[Any, str] = field(default_factory=dict)
+
+
+_current_turn: ContextVar[Optional[ToolCallStats]] = ContextVar('tool_call_turn', default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_db_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_turn.get()
+    if stats is not None:
+        stats.db_queries += 1
+
+
+@contextmanager
+def tool_call_scope():
+    """
+    Scope one agent turn: read-only tool results are memoized for its duration and its
+    tool calls and DB queries are counted. A nested scope joins the enclosing one.
+
+    Yields:
+        ToolCallStats: The counters for the turn
+    """
+    stats = _current_turn.get()
+    if stats is not None:
+        yield stats
+        return
+
+    stats = ToolCallStats()
+    token = _current_turn.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_turn.reset(token)
+
+
+def _out_of_time(func) -> Optional[str]:
+    """Error result for a tool called after the turn's deadline, which the caller has already given up on"""
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired:
+        logger.warning(f"Skipping {func.__name__}: the turn's time budget is exhausted")
+        return json.dumps({"error": "Time budget for this turn is exhausted"})
+    return None
+
+
+def memoize_per_turn(func):
+    """Cache a read-only tool's result per arguments for the current tool_call_scope"""
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        expired = _out_of_time(func)
+        if expired:
+            return expired
+
+        stats = _current_turn.get()
+        if stats is None:
+            return func(*args, **kwargs)
+
+        stats.tool_calls += 1
+        try:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__name__, tuple(bound.arguments.items()))
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        if key in stats.cache:
+            stats.cache_hits += 1
+            logger.info(f"Reusing {func.__name__} result from earlier in this turn")
+            return stats.cache[key]
+
+        result = func(*args, **kwargs)
+        stats.cache[key] = result
+        return result
+    return wrapper
+
+
+def invalidates_turn_cache(func):
+    """Drop the current turn's memoized tool results after a tool that writes"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Never write on behalf of a turn that has already timed out
+        expired = _out_of_time(func)
+        if expired:
+            return expired
+
+        stats = _current_turn.get()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if stats is not None:
+                stats.tool_calls += 1
+                stats.cache.clear()
+    return wrapper
+
+
+@memoize_per_turn
 def get_available_jobs() -> str:
     """
     Get a list of all available jobs.
@@ -12,13 +126,50 @@ def get_available_jobs() -> str:
         str: JSON string with all available jobs
     """
     try:
-        jobs = Job.query.all()
+        jobs = serialize_jobs(Job.query.order_by(Job.id))
         logger.info(f"Retrieved {len(jobs)} available jobs")
-        return json.dumps([job.to_dict() for job in jobs])
+        return dumps(jobs).decode('utf-8')
     except Exception as e:
         logger.error("Error retrieving available jobs", exc_info=True)
         return json.dumps({"error": "Failed to retrieve jobs"})
 
+@memoize_per_turn
+def search_jobs(query: str) -> str:
+    """
+    Search available jobs by keywords in their title, department, description or requirements.
+    
+    Args:
+        query: str: Keywords describing the job the candidate is looking for (e.g. "python backend")
+        
+    Returns:
+        str: JSON string with up to 10 matching jobs (id, title, department)
+    """
+    try:
+        keywords = [word for word in query.split() if word][:5]
+        if not keywords:
+            return json.dumps([])
+        
+        jobs_query = db.session.query(Job.id, Job.jobTitle, Job.department)
+        for word in keywords:
+            pattern = f"%{word}%"
+            jobs_query = jobs_query.filter(or_(
+                Job.jobTitle.ilike(pattern),
+                Job.department.ilike(pattern),
+                Job.description.ilike(pattern),
+                Job.requirements.ilike(pattern)
+            ))
+        
+        jobs = [
+            {'id': job_id, 'jobTitle': title, 'department': department}
+            for job_id, title, department in jobs_query.order_by(Job.id).limit(10)
+        ]
+        logger.info(f"Found {len(jobs)} jobs matching '{query}'")
+        return json.dumps(jobs)
+    except Exception:
+        logger.error(f"Error searching jobs for '{query}'", exc_info=True)
+        return json.dumps({"error": "Failed to search jobs"})
+
+@memoize_per_turn
 def get_job_details(job_id: int) -> str:
     """
     Get detailed information about a specific job.
@@ -41,6 +192,7 @@ def get_job_details(job_id: int) -> str:
         logger.error(f"Error retrieving job details for job ID {job_id}", exc_info=True)
         return json.dumps({"error": "Failed to retrieve job details"})
 
+@memoize_per_turn
 def get_job_questions(job_id: int) -> str:
     """
     Get all screening questions for a specific job.
@@ -63,6 +215,7 @@ def get_job_questions(job_id: int) -> str:
         logger.error(f"Error retrieving questions for job ID {job_id}", exc_info=True)
         return json.dumps({"error": "Failed to retrieve job questions"})
 
+@invalidates_turn_cache
 def submit_application(
     job_id: int, 
     applicant_name: str, 
@@ -92,7 +245,7 @@ def submit_application(
             logger.warning(f"Cannot submit application - job not found with ID: {job_id}")
             return json.dumps({"success": False, "message": "Job not found."})
         
-        # Create new application
+        # Create the application and its answers in one transaction
         application = Application(
             job_id=job_id,
             applicant_name=applicant_name,
@@ -102,23 +255,22 @@ def submit_application(
             status="new"
         )
         
-        db.session.add(application)
-        db.session.commit()
-        
-        # Add answers if provided
+        answers_added = 0
         if answers and isinstance(answers, list):
             for answer_data in answers:
                 if 'question' in answer_data and 'answer' in answer_data:
-                    answer = Answer(
-                        application_id=application.id,
+                    answers_added += 1
+                    application.answers.append(Answer(
                         question_text=answer_data['question'],
                         answer_text=answer_data['answer'],
                         required=answer_data.get('required', True)
-                    )
-                    db.session.add(answer)
-            
-            db.session.commit()
-            logger.info(f"Added {len(answers)} answers to application {application.id}")
+                    ))
+        
+        db.session.add(application)
+        db.session.commit()
+        
+        if answers_added:
+            logger.info(f"Added {answers_added} answers to application {application.id}")
         
         logger.info(f"Application submitted: ID={application.id}, Name={applicant_name}, Job ID={job_id}")
         
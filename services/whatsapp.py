@@ -1,37 +1,155 @@
 import os
+import time
+import random
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from logger import logger
 
 # Load environment variables
 load_dotenv()
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Longest wait between retries, also for a server-sent Retry-After
+MAX_RETRY_DELAY = 30
+
+
+class GraphAPIClient:
+    """
+    Shared client for the WhatsApp Graph API.
+
+    Holds one requests.Session with a connection pool, so replies reuse open
+    keep-alive connections instead of paying DNS, TCP and TLS setup every time.
+    Requests have connect/read timeouts and are retried with jittered exponential
+    backoff on 429/5xx responses and connection errors. A read timeout is not
+    retried, since the message may already have been delivered.
+    """
+
+    def __init__(
+        self,
+        api_token: Optional[str],
+        phone_number_id: Optional[str],
+        api_version: str = 'v22.0',
+        base_url: str = 'https://graph.facebook.com',
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        pool_size: int = 20
+    ):
+        self.api_token = api_token
+        self.phone_number_id = phone_number_id
+        self.api_version = api_version
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_token}"})
+
+    @classmethod
+    def from_env(cls) -> 'GraphAPIClient':
+        return cls(
+            api_token=os.getenv('WHATSAPP_API_TOKEN'),
+            phone_number_id=os.getenv('WHATSAPP_PHONE_NUMBER_ID'),
+            api_version=os.getenv('WHATSAPP_API_VERSION', 'v22.0'),
+            base_url=os.getenv('WHATSAPP_API_BASE_URL', 'https://graph.facebook.com'),
+            connect_timeout=float(os.getenv('WHATSAPP_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(os.getenv('WHATSAPP_READ_TIMEOUT', 10)),
+            max_retries=int(os.getenv('WHATSAPP_MAX_RETRIES', 3)),
+            pool_size=int(os.getenv('WHATSAPP_POOL_SIZE', 20))
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_token and self.phone_number_id)
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{self.api_version}/{self.phone_number_id}/{path}"
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), MAX_RETRY_DELAY)
+        return min(self.backoff * (2 ** attempt), MAX_RETRY_DELAY) * random.uniform(0.5, 1.5)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the Graph API, retrying on 429/5xx and connection errors.
+
+        Returns:
+            requests.Response: The last response received
+
+        Raises:
+            requests.RequestException: If the request could not be completed
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url(path)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.warning(f"Connection error calling Graph API, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            delay = self._retry_delay(attempt, response)
+            logger.warning(f"Graph API returned HTTP {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_graph_client() -> GraphAPIClient:
+    """Return the process-wide Graph API client, creating it from the environment on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GraphAPIClient.from_env()
+    return _client
+
+
+class WhatsAppSendError(Exception):
+    """Raised when a reply could not be delivered through the Graph API"""
+
 
 def send_whatsapp_message(recipient, message):
     """
     Send a WhatsApp message to the recipient.
-    
+
     Args:
         recipient (str): The recipient's phone number
         message (str): The message to send
-        
+
     Returns:
         bool: True if successful, False otherwise
     """
-    whatsapp_api_token = os.getenv('WHATSAPP_API_TOKEN')
-    whatsapp_api_version = os.getenv('WHATSAPP_API_VERSION', 'v22.0')
-    whatsapp_phone_number_id = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
-    
-    whatsapp_api_url = f"https://graph.facebook.com/{whatsapp_api_version}/{whatsapp_phone_number_id}/messages"
-    
-    if not whatsapp_api_url or not whatsapp_api_token:
+    client = get_graph_client()
+
+    if not client.configured:
         # Log that WhatsApp integration is not configured
         logger.warning(f"WhatsApp API not configured. Would send to {recipient}: {message[:30]}...")
         return False
-    
+
     try:
         logger.info(f"Sending WhatsApp message to {recipient} (length: {len(message)} chars)")
-        
+
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -41,60 +159,67 @@ def send_whatsapp_message(recipient, message):
                 "body": message
             }
         }
-        
-        headers = {
-            "Authorization": f"Bearer {whatsapp_api_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(whatsapp_api_url, json=payload, headers=headers)
+
+        response = client.request('POST', 'messages', json=payload)
         if response.status_code != 200:
             logger.error(f"Failed to send WhatsApp message: HTTP {response.status_code} - {response.text}")
             return False
-        
+
         logger.info(f"Successfully sent WhatsApp message to {recipient}")
         return True
     except Exception as e:
         logger.error(f"Error sending WhatsApp message to {recipient}", exc_info=True)
         return False
 
+def send_whatsapp_messages(messages: List[Tuple[str, str]], max_workers: Optional[int] = None) -> List[bool]:
+    """
+    Send many WhatsApp messages concurrently over the shared connection pool.
+
+    Args:
+        messages: List of (recipient, message) pairs
+        max_workers: Maximum concurrent sends (defaults to the connection pool size)
+
+    Returns:
+        list: One success flag per message, in the same order
+    """
+    if not messages:
+        return []
+
+    max_workers = max_workers or get_graph_client().pool_size
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(messages))) as executor:
+        results = list(executor.map(lambda m: send_whatsapp_message(*m), messages))
+
+    logger.info(f"Batch sent {sum(results)} of {len(messages)} WhatsApp messages")
+    return results
+
 def get_media_url(media_id):
     """
     Get the URL for a media file from WhatsApp API.
-    
+
     Args:
         media_id (str): The media ID from WhatsApp
-        
+
     Returns:
         str: The URL to download the media, or None if failed
     """
-    whatsapp_api_token = os.getenv('WHATSAPP_API_TOKEN')
-    whatsapp_api_version = os.getenv('WHATSAPP_API_VERSION', 'v22.0')
-    whatsapp_phone_number_id = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
-    
-    if not all([whatsapp_api_token, whatsapp_phone_number_id]):
+    client = get_graph_client()
+
+    if not client.configured:
         logger.warning("WhatsApp API not fully configured for media download")
         return None
-    
+
     try:
         logger.info(f"Retrieving media URL for media ID: {media_id}")
-        
-        # Construct the URL to get media URL
-        media_url = f"https://graph.facebook.com/{whatsapp_api_version}/{whatsapp_phone_number_id}/media/{media_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {whatsapp_api_token}"
-        }
-        
-        response = requests.get(media_url, headers=headers)
+
+        response = client.request('GET', f"media/{media_id}")
         if response.status_code != 200:
             logger.error(f"Failed to get media URL: HTTP {response.status_code} - {response.text}")
             return None
-            
+
         media_data = response.json()
         media_url = media_data.get('url')
         logger.info(f"Successfully retrieved media URL for media ID {media_id}")
         return media_url
     except Exception as e:
         logger.error(f"Error getting WhatsApp media URL for media ID {media_id}", exc_info=True)
-        return None 
\ No newline at end of file
+        return None
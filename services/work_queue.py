@@ -0,0 +1,292 @@
+import json
+import time
+import random
+import sqlite3
+import threading
+from typing import Callable, Optional, Dict, Any, List, Tuple
+from logger import logger
+
+
+class WorkQueue:
+    """
+    Durable work queue stored in a local SQLite file.
+
+    A claimed item stays in the table but becomes invisible to other workers for
+    `visibility_timeout` seconds. If the worker acks it, it is deleted; if the worker
+    crashes or nacks it, it becomes visible again and is retried, up to `max_attempts`
+    times, after which it is kept with state 'dead' for inspection.
+
+    Items may belong to a lane. Items of one lane are processed one at a time, in
+    order, and an item that has not been claimed yet can absorb newer items of its
+    lane (see enqueue).
+
+    Several processes on the same host can share one queue file.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 120, max_attempts: int = 5):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_error TEXT,
+                    lane TEXT
+                )
+            """)
+            # Queue files created before lanes existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(work_items)")}
+            if 'lane' not in columns:
+                conn.execute("ALTER TABLE work_items ADD COLUMN lane TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_work_items_state_available_at ON work_items (state, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_work_items_lane_state_id ON work_items (lane, state, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(
+        self,
+        payload: Dict[str, Any],
+        lane: Optional[str] = None,
+        delay: float = 0,
+        max_delay: Optional[float] = None,
+        merge: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]] = None
+    ) -> Tuple[int, bool]:
+        """
+        Persist a new work item, or fold it into the lane's unclaimed item.
+
+        When merge is given and the newest item of the lane has not been claimed yet,
+        merge(queued_payload, payload) is stored on that item instead of inserting a new
+        one, and its delay restarts (but never beyond max_delay after it was first queued).
+        If merge returns None, the payload is queued as a separate item.
+
+        Args:
+            payload: JSON-serializable item data
+            lane: Optional key of the lane the item belongs to
+            delay: Seconds before the item becomes visible to workers
+            max_delay: Upper bound on how long merging may keep postponing an item
+            merge: Optional callable combining a queued payload with a new one
+
+        Returns:
+            tuple: (item id, whether the payload was merged into an existing item)
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if lane is not None and merge is not None:
+                row = conn.execute(
+                    "SELECT id, payload, attempts, created_at FROM work_items WHERE lane = ? AND state = 'pending' ORDER BY id DESC LIMIT 1",
+                    (lane,)
+                ).fetchone()
+                if row is not None and row[2] == 0:
+                    merged = merge(json.loads(row[1]), payload)
+                    if merged is not None:
+                        available_at = now + delay
+                        if max_delay is not None:
+                            available_at = min(available_at, row[3] + max_delay)
+                        conn.execute(
+                            "UPDATE work_items SET payload = ?, available_at = ? WHERE id = ?",
+                            (json.dumps(merged), available_at, row[0])
+                        )
+                        conn.execute("COMMIT")
+                        return row[0], True
+
+            cursor = conn.execute(
+                "INSERT INTO work_items (payload, lane, available_at, created_at) VALUES (?, ?, ?, ?)",
+                (json.dumps(payload), lane, now + delay, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.lastrowid, False
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest visible item, hiding it from other workers.
+
+        An item is skipped while an older item of its lane is still pending (in flight,
+        waiting for a retry, or not yet visible), which keeps each lane in order.
+
+        Items that became visible again without being acked or nacked (their worker
+        crashed or outlived the visibility timeout) after max_attempts claims are marked
+        dead here, so they neither run forever nor block their lane.
+
+        Returns:
+            dict: {'id', 'payload', 'attempts'} or None if nothing is available
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                """
+                UPDATE work_items SET state = 'dead',
+                    last_error = COALESCE(last_error || '; ', '') || 'visibility timeout expired on the last attempt'
+                WHERE state = 'pending' AND available_at <= ? AND attempts >= ?
+                """,
+                (now, self.max_attempts)
+            ).rowcount
+            if expired:
+                logger.error(f"Marked {expired} work items dead after {self.max_attempts} attempts timed out")
+            row = conn.execute(
+                """
+                SELECT id, payload, attempts FROM work_items w
+                WHERE state = 'pending' AND available_at <= ?
+                AND (lane IS NULL OR NOT EXISTS (
+                    SELECT 1 FROM work_items earlier
+                    WHERE earlier.lane = w.lane AND earlier.state = 'pending' AND earlier.id < w.id
+                ))
+                ORDER BY id LIMIT 1
+                """,
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE work_items SET available_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (now + self.visibility_timeout, row[0])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {'id': row[0], 'payload': json.loads(row[1]), 'attempts': row[2] + 1}
+
+    def ack(self, item_id: int):
+        """Delete a successfully processed item"""
+        self._connect().execute("DELETE FROM work_items WHERE id = ?", (item_id,))
+
+    def nack(self, item_id: int, attempts: int, error: str, payload: Optional[Dict[str, Any]] = None):
+        """
+        Return a failed item to the queue with exponential backoff, or mark it dead
+        once it has used up its attempts.
+
+        If payload is given it replaces the stored one, so a handler can record what it
+        already finished and the retry can pick up from there.
+        """
+        conn = self._connect()
+        if payload is not None:
+            conn.execute("UPDATE work_items SET payload = ? WHERE id = ?", (json.dumps(payload), item_id))
+        if attempts >= self.max_attempts:
+            conn.execute("UPDATE work_items SET state = 'dead', last_error = ? WHERE id = ?", (error, item_id))
+            logger.error(f"Work item {item_id} failed {attempts} times, giving up: {error}")
+            return
+        delay = min(2 ** attempts, 300) * random.uniform(0.5, 1.5)
+        conn.execute(
+            "UPDATE work_items SET available_at = ?, last_error = ? WHERE id = ?",
+            (time.time() + delay, error, item_id)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Return item counts by state"""
+        rows = self._connect().execute("SELECT state, COUNT(*) FROM work_items GROUP BY state").fetchall()
+        return dict(rows)
+
+
+class WorkerPool:
+    """Background threads that claim items from a WorkQueue and pass their payload to a handler"""
+
+    def __init__(self, queue: WorkQueue, handler: Callable[[Dict[str, Any]], None], size: int = 4, poll_interval: float = 0.2):
+        self.queue = queue
+        self.handler = handler
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, name=f"work-queue-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.size} work queue workers on {self.queue.path}")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self.queue.claim()
+            except Exception:
+                logger.error("Error claiming work item", exc_info=True)
+                self._stop.wait(self.poll_interval)
+                continue
+
+            if item is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                self.handler(item['payload'])
+                self.queue.ack(item['id'])
+            except Exception as e:
+                logger.error(f"Error processing work item {item['id']} (attempt {item['attempts']})", exc_info=True)
+                # The handler may have recorded progress in the payload
+                self.queue.nack(item['id'], item['attempts'], str(e), payload=item['payload'])
+
+
+def init_work_queue(app, handler: Callable[[Dict[str, Any]], None]) -> WorkQueue:
+    """
+    Create the application's work queue and register the handler for its items.
+
+    No workers are started here, so CLI commands and scripts that import the app can
+    enqueue without claiming items they would abandon on exit; the process that
+    serves requests calls start_work_queue_workers.
+
+    Returns:
+        WorkQueue: The queue, also available as app.extensions['work_queue']
+    """
+    queue = WorkQueue(
+        app.config['WORK_QUEUE_PATH'],
+        visibility_timeout=app.config['WORK_QUEUE_VISIBILITY_TIMEOUT'],
+        max_attempts=app.config['WORK_QUEUE_MAX_ATTEMPTS']
+    )
+    app.extensions['work_queue'] = queue
+    app.extensions['work_queue_handler'] = handler
+    return queue
+
+
+def start_work_queue_workers(app) -> Optional[WorkerPool]:
+    """
+    Start WEBHOOK_WORKERS background workers on the application's work queue, once.
+
+    The handler runs inside an application context. With WEBHOOK_WORKERS set to 0 this
+    process only enqueues (e.g. when another process runs the workers).
+
+    Returns:
+        WorkerPool: The running workers, also available as app.extensions['work_queue_workers'], or None
+    """
+    pool = app.extensions.get('work_queue_workers')
+    if pool is not None or app.config['WEBHOOK_WORKERS'] <= 0:
+        return pool
+
+    handler = app.extensions['work_queue_handler']
+
+    def run_in_app_context(payload):
+        with app.app_context():
+            handler(payload)
+
+    pool = WorkerPool(app.extensions['work_queue'], run_in_app_context, size=app.config['WEBHOOK_WORKERS'])
+    pool.start()
+    app.extensions['work_queue_workers'] = pool
+    return pool
@@ -0,0 +1,12 @@
+"""
+Entry point for WSGI servers, e.g. `gunicorn wsgi:app`.
+
+Importing app.py alone (CLI commands, scripts, benchmarks) only enqueues WhatsApp
+messages; serving through this module also starts the work queue's background workers
+in the serving process. Don't load it in a pre-fork master (gunicorn --preload): the
+workers are threads and would not survive the fork.
+"""
+from app import app
+from services.work_queue import start_work_queue_workers
+
+start_work_queue_workers(app)